@@ -2,60 +2,136 @@ TOOL_NAME = 'PulseQL'
 TOOL_VERSION = 'v.0.5.1 beta'
 
 
+import os
+import re
 import sys
+import time
 import json
 import socket
-import logging
+import struct
+import queue
 import sqlite3
 import argparse
+import threading
 import socketserver
 from datetime import datetime
-from rich.console import Console
-from typing import Any, Tuple, Union, Optional, Iterable, Dict
-from prompt_toolkit import PromptSession
-from prompt_toolkit.buffer import Buffer
-from prompt_toolkit.document import Document
-from prompt_toolkit.lexers import PygmentsLexer
-from prompt_toolkit.styles import style_from_pygments_cls
-from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
-from pygments.style import Style
-from pygments.lexer import RegexLexer
-#from pygments.lexers.sql import SqlLexer
-from pygments.token import (
-    Keyword,
-    Name,
-    Operator,
-    Punctuation,
-    String,
-    Text,
-    Whitespace,
-    Number,
-    Comment
-)
+from bisect import bisect_left
+from functools import lru_cache
+from collections import deque, OrderedDict
+from contextlib import nullcontext, contextmanager
+from typing import Any, Tuple, Union, Optional, Iterable, Iterator, List, Dict, Set, TextIO, TYPE_CHECKING
+if TYPE_CHECKING:
+    import asyncio
+    from rich.console import Console
+    from prompt_toolkit.auto_suggest import AutoSuggest
 
 
 
 class Utils:
+    outputFormats = ('str', 'json', 'ndjson')
+    jsonEncoder = json.JSONEncoder(default=bytes.hex)
+    readOnlyStatementRegex = re.compile(r'^(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/|\()*(SELECT|VALUES|EXPLAIN|WITH)\b', re.IGNORECASE | re.DOTALL)
+    writeKeywordRegex = re.compile(r"""'[^']*'|"[^"]*"|--[^\n]*|/\*.*?(?:\*/|$)|\b(INSERT|UPDATE|DELETE|REPLACE)\b(?!\s*\()""", re.IGNORECASE | re.DOTALL)
+
+    @staticmethod
+    def createConsole() -> 'Console':
+        from rich.console import Console
+        return Console()
+
     @staticmethod
-    def printHeader(console:Console, mode:str) -> None:
+    def printHeader(console:'Console', mode:str) -> None:
         console.print(f'{TOOL_NAME} {TOOL_VERSION} {mode} is running.')
 
     @staticmethod
     def queryExecute(database:sqlite3.Connection, query:str, alternativeSql:Optional[Dict[str, str]], toJson:bool=False) -> Any:
-        result = None
-        try:
-            if alternativeSql:
-                query = Utils.convertQuery(query, alternativeSql) if alternativeSql else query
-            cursor = database.cursor()
-            cursor.execute(query)
-            result = cursor.fetchall()
-            if toJson:
-                result = json.dumps(result)
-        except (sqlite3.Error, json.JSONDecodeError) as e:
-            raise e
+        result = [row for rows in SqlQueryStream(database, query, alternativeSql) for row in rows]
+        return json.dumps(result) if toJson else result
+
+    @staticmethod
+    def cacheCommand(cache:Optional['QueryResultCache'], command:str, batchSize:int=500) -> 'SqlQueryStream':
+        if cache and command.split()[1:]==['clear']:
+            cache.invalidate()
+        return SqlQueryStream.fromRows(['name', 'value'], list(cache.stats().items()) if cache else [('enabled', False)], batchSize)
+
+    @staticmethod
+    def encodeRows(rows:List[tuple], outputFormat:str) -> str:
+        if outputFormat=='ndjson':
+            return ''.join(Utils.jsonEncoder.encode(row)+'\n' for row in rows)
+        if outputFormat=='json':
+            return Utils.jsonEncoder.encode(rows)
+        return str(rows)
+
+    @staticmethod
+    def encodeStream(batches:Iterable[List[tuple]], outputFormat:str) -> Iterator[str]:
+        if outputFormat=='ndjson':
+            for rows in batches:
+                yield Utils.encodeRows(rows, outputFormat)
+            return
+        yield '['
+        separator = ''
+        for rows in batches:
+            yield separator+Utils.encodeRows(rows, outputFormat)[1:-1]
+            separator = ', '
+        yield ']'
+
+    @staticmethod
+    def coalesceChunks(chunks:Iterator[Union[bytes, list]], size:int) -> Iterator[Union[bytes, list]]:
+        buffer, buffered = [], 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, list):
+                    if buffer:
+                        yield b''.join(buffer)
+                        buffer, buffered = [], 0
+                    yield chunk
+                    continue
+                if not chunk:
+                    if buffer:
+                        yield b''.join(buffer)
+                        buffer, buffered = [], 0
+                    continue
+                buffer.append(chunk)
+                buffered += len(chunk)
+                if buffered>=size:
+                    yield b''.join(buffer)
+                    buffer, buffered = [], 0
+            if buffer:
+                yield b''.join(buffer)
         finally:
-            database.commit()
-        return result
+            chunks.close()
+
+    @staticmethod
+    def sendBuffers(sock:socket.socket, buffers:List[Union[bytes, memoryview]]) -> None:
+        if not hasattr(sock, 'sendmsg'):
+            for buffer in buffers:
+                sock.sendall(buffer)
+            return
+        buffers = [memoryview(buffer).cast('B') for buffer in buffers if len(buffer)]
+        while buffers:
+            sent = sock.sendmsg(buffers[:512])
+            while sent:
+                if sent>=len(buffers[0]):
+                    sent -= len(buffers.pop(0))
+                else:
+                    buffers[0] = buffers[0][sent:]
+                    sent = 0
+
+    @staticmethod
+    def isReadOnlyQuery(query:str) -> bool:
+        match = Utils.readOnlyStatementRegex.match(query)
+        if not match:
+            return False
+        if match.group(1).upper() in ('WITH', 'EXPLAIN'):
+            return not any(keyword.group(1) for keyword in Utils.writeKeywordRegex.finditer(query, match.end()))
+        return True
+
+    @staticmethod
+    def isBusyError(error:Exception) -> bool:
+        return isinstance(error, sqlite3.OperationalError) and str(error).startswith(('database is locked', 'database table is locked', 'database is busy'))
+
+    @staticmethod
+    def isReadOnlyError(error:Exception) -> bool:
+        return isinstance(error, sqlite3.OperationalError) and str(error).startswith('attempt to write a readonly database')
 
     @staticmethod
     def validateAddress(arg:str) -> Tuple[str, int]:
@@ -82,13 +158,7 @@ class Utils:
     
     @staticmethod
     def convertQuery(query:str, alternativeSql:Dict[str, str]) -> str:
-        words = query.split(' ')
-        query = ''
-        for i in range(len(words)):
-            if words[i] in alternativeSql.keys():
-                words[i] = alternativeSql[words[i]]
-            query += words[i]+' '
-        return query[:-1]
+        return SqlTranslator.compiled(alternativeSql).translate(query)
     
     @staticmethod
     def listToRegex(elements:Iterable[str], prefix:Optional[str]=None, separator:Optional[str]='.') -> str:
@@ -99,26 +169,547 @@ class Utils:
         return s[:-1]
 
     @staticmethod
-    def getDatabaseTables() -> Iterable[str]:
-        return [] #FIXME
+    def getDatabaseTables(database:sqlite3.Connection) -> List[str]:
+        return [row[0] for row in database.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%' ORDER BY name")]
     
     @staticmethod
-    def getDatabaseTableColumns(tableName:str) -> Iterable[str]:
-        return [] #FIXME
+    def getDatabaseTableColumns(database:sqlite3.Connection, tableName:str) -> List[str]:
+        return [row[0] for row in database.execute('SELECT name FROM pragma_table_info(?) ORDER BY cid', (tableName,))]
+
+    @staticmethod
+    def getDatabaseSchema(database:sqlite3.Connection) -> Dict[str, List[str]]:
+        schema = {}
+        for table, column in database.execute("SELECT m.name, p.name FROM sqlite_master AS m LEFT JOIN pragma_table_info(m.name) AS p WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%' ORDER BY m.name, p.cid"):
+            columns = schema.setdefault(table, [])
+            if column is not None:
+                columns.append(column)
+        return schema
+
+
+class SqlTranslator:
+    skipPattern = r"""'[^']*(?:''[^']*)*'?|"[^"]*(?:""[^"]*)*"?|`[^`]*`?|\[[^\]]*\]?|--[^\n]*|/\*[\s\S]*?(?:\*/|\Z)"""
+    maxMemoized = 4096
+    maxMemoizedLength = 8192
+    compiledTranslators = {}
+    compiledLock = threading.Lock()
+
+    def __init__(self, alternativeSql:Dict[str, str]) -> None:
+        self.alternativeSql = {key: value for key, value in alternativeSql.items() if key}
+        self.regex = self._compile_(sorted(self.alternativeSql, key=len, reverse=True)) if self.alternativeSql else None
+        self.memoized = lru_cache(maxsize=self.maxMemoized)(self._translate_)
+
+    @classmethod
+    def compiled(cls, alternativeSql:Dict[str, str]) -> 'SqlTranslator':
+        entry = cls.compiledTranslators.get(id(alternativeSql))
+        if entry is None or entry[0] is not alternativeSql:
+            with cls.compiledLock:
+                entry = (alternativeSql, cls(alternativeSql))
+                cls.compiledTranslators[id(alternativeSql)] = entry
+        return entry[1]
+
+    def translate(self, query:str) -> str:
+        return self.memoized(query) if len(query)<=self.maxMemoizedLength else self._translate_(query)
+
+    def _translate_(self, query:str) -> str:
+        return self.regex.sub(self._replace_, query) if self.regex else query
+
+    def _replace_(self, match:re.Match) -> str:
+        return match.group(1) or self.alternativeSql[match.group(0)]
+
+    def _compile_(self, keys:List[str]) -> re.Pattern:
+        words = '|'.join(re.escape(key) for key in keys)
+        symbols = '|'.join(re.escape(key) for key in keys if not re.match(r'[\w$]', key))
+        keywords = '|'.join((r'(?<![\w$])' if re.match(r'[\w$]', key) else '')+re.escape(key)+(r'(?![\w$])' if re.search(r'[\w$]$', key) else '') for key in keys)
+        punctuation = f"(?:(?!{symbols})[^\\w$'\"`\\[/.-])+" if symbols else f"[^\\w$'\"`\\[/.-]+"
+        qualified = f'(?!{symbols})\\.(?:\\s*[\\w$]+)?' if symbols else r'\.(?:\s*[\w$]+)?'
+        token = f'{punctuation}|{qualified}|{self.skipPattern}|(?!(?:{words})(?![\\w$]))[\\w$]+|/(?!\\*)|-(?!-)'
+        return re.compile(f'((?:{token})+)|{keywords}')
+
+
+class SqlAccessTracker:
+    writeActions = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+    schemaActions = (sqlite3.SQLITE_CREATE_INDEX, sqlite3.SQLITE_CREATE_TABLE, sqlite3.SQLITE_CREATE_TEMP_INDEX, sqlite3.SQLITE_CREATE_TEMP_TABLE,
+                     sqlite3.SQLITE_CREATE_TEMP_TRIGGER, sqlite3.SQLITE_CREATE_TEMP_VIEW, sqlite3.SQLITE_CREATE_TRIGGER, sqlite3.SQLITE_CREATE_VIEW,
+                     sqlite3.SQLITE_DROP_INDEX, sqlite3.SQLITE_DROP_TABLE, sqlite3.SQLITE_DROP_TEMP_INDEX, sqlite3.SQLITE_DROP_TEMP_TABLE,
+                     sqlite3.SQLITE_DROP_TEMP_TRIGGER, sqlite3.SQLITE_DROP_TEMP_VIEW, sqlite3.SQLITE_DROP_TRIGGER, sqlite3.SQLITE_DROP_VIEW,
+                     sqlite3.SQLITE_ALTER_TABLE, sqlite3.SQLITE_CREATE_VTABLE, sqlite3.SQLITE_DROP_VTABLE, sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH)
+    volatileActions = (sqlite3.SQLITE_PRAGMA, sqlite3.SQLITE_TRANSACTION, sqlite3.SQLITE_SAVEPOINT)
+    volatileFunctions = frozenset(('random', 'randomblob', 'changes', 'total_changes', 'last_insert_rowid', 'date', 'time', 'datetime',
+                                   'julianday', 'strftime', 'unixepoch', 'timediff', 'sqlite_offset', 'load_extension'))
+    volatileKeywordRegex = re.compile(r"""'[^']*'|"[^"]*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)|\b(CURRENT_TIMESTAMP|CURRENT_DATE|CURRENT_TIME)\b""", re.IGNORECASE | re.DOTALL)
+
+    def __init__(self) -> None:
+        self.read = set()
+        self.written = set()
+        self.schemaChanged = False
+        self.cacheable = True
+
+    def __call__(self, action:int, arg1:Optional[str], arg2:Optional[str], database:Optional[str], trigger:Optional[str]) -> int:
+        if action==sqlite3.SQLITE_READ:
+            self.read.add(arg1.lower())
+        elif action in self.writeActions:
+            self.written.add(arg1.lower())
+        elif action==sqlite3.SQLITE_FUNCTION:
+            if arg2.lower() in self.volatileFunctions:
+                self.cacheable = False
+        elif action in self.schemaActions:
+            self.schemaChanged = True
+        elif action in self.volatileActions:
+            self.cacheable = False
+        return sqlite3.SQLITE_OK
+
+    def unknown(self) -> 'SqlAccessTracker':
+        self.cacheable = False
+        self.schemaChanged = True
+        return self
+
+
+class QueryResultCache:
+    normalizeRegex = re.compile(r"""('[^']*'|"[^"]*")|\s+""")
+    maxAnalyses = 4096
+
+    def __init__(self, path:str, maxEntries:int=1024, maxBytes:int=64*1024*1024, ttl:float=60.0, maxRows:int=10000) -> None:
+        self.maxEntries = max(1, maxEntries)
+        self.maxBytes = maxBytes
+        self.ttl = ttl
+        self.maxRows = maxRows
+        self.entries = OrderedDict()
+        self.tableKeys = {}
+        self.tableVersions = {}
+        self.clearedVersion = 0
+        self.version = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+        self.analyses = OrderedDict()
+        self.schemaVersion = None
+        self.path = path
+        self.analyzers = []
+        self.localAnalyzer = threading.local()
+        self.analyzerLock = threading.Lock()
+
+    @staticmethod
+    def normalize(query:str) -> str:
+        return QueryResultCache.normalizeRegex.sub(lambda match: match.group(1) or ' ', query).strip().rstrip(';').rstrip()
+
+    def analyze(self, query:str, params:Optional[Union[list, tuple, dict]]=None) -> SqlAccessTracker:
+        analyzer = self._analyzer_()
+        schemaVersion = analyzer.execute('PRAGMA schema_version').fetchone()[0]
+        with self.analyzerLock:
+            if schemaVersion!=self.schemaVersion:
+                self.analyses.clear()
+                if self.schemaVersion is not None:
+                    self._clear_()
+                self.schemaVersion = schemaVersion
+            tracker = self.analyses.get(query)
+            if tracker is not None:
+                self.analyses.move_to_end(query)
+                return tracker
+        tracker = SqlAccessTracker()
+        analyzer.set_authorizer(tracker)
+        try:
+            analyzer.execute(f'EXPLAIN {query}', () if params is None else params).close()
+        except sqlite3.Error:
+            tracker.unknown()
+        finally:
+            analyzer.set_authorizer(None)
+        if any(keyword.group(1) for keyword in SqlAccessTracker.volatileKeywordRegex.finditer(query)):
+            tracker.cacheable = False
+        if not tracker.schemaChanged:
+            with self.analyzerLock:
+                self.analyses[query] = tracker
+                if len(self.analyses)>self.maxAnalyses:
+                    self.analyses.popitem(last=False)
+        return tracker
+
+    def get(self, key:str) -> Optional[Tuple[List[str], List[tuple]]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0]<time.monotonic():
+                if entry is not None:
+                    self._remove_(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def put(self, key:str, tables:Set[str], columns:List[str], rows:List[tuple], version:int) -> None:
+        size = sum(len(value) if isinstance(value, (str, bytes)) else 8 for row in rows for value in row)+64*len(rows)
+        if size>self.maxBytes:
+            return
+        with self.lock:
+            if self.clearedVersion>version or any(self.tableVersions.get(table, 0)>version for table in tables):
+                return
+            if key in self.entries:
+                self._remove_(key)
+            self.entries[key] = (time.monotonic()+self.ttl, tables, columns, rows, size)
+            self.size += size
+            for table in tables:
+                self.tableKeys.setdefault(table, set()).add(key)
+            while len(self.entries)>self.maxEntries or self.size>self.maxBytes:
+                self._remove_(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables:Optional[Iterable[str]]=None) -> None:
+        if tables is None:
+            with self.analyzerLock:
+                self.analyses.clear()
+            self._clear_()
+            return
+        with self.lock:
+            self.version += 1
+            for table in tables:
+                self.tableVersions[table] = self.version
+                for key in list(self.tableKeys.get(table, ())):
+                    self._remove_(key)
+                    self.invalidations += 1
+
+    def currentVersion(self) -> int:
+        with self.lock:
+            return self.version
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits+self.misses
+            return {'entries': len(self.entries), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': round(self.hits/lookups, 4) if lookups else 0.0, 'evictions': self.evictions, 'invalidations': self.invalidations}
+
+    def close(self) -> None:
+        with self.analyzerLock:
+            for analyzer in self.analyzers:
+                analyzer.close()
+            self.analyzers.clear()
+
+    def _analyzer_(self) -> sqlite3.Connection:
+        analyzer = getattr(self.localAnalyzer, 'connection', None)
+        if analyzer is None:
+            analyzer = self.localAnalyzer.connection = sqlite3.connect(self.path, cached_statements=0, check_same_thread=False)
+            with self.analyzerLock:
+                self.analyzers.append(analyzer)
+        return analyzer
+
+    def _clear_(self) -> None:
+        with self.lock:
+            self.version += 1
+            self.invalidations += len(self.entries)
+            self.clearedVersion = self.version
+            self.entries.clear()
+            self.tableKeys.clear()
+            self.tableVersions.clear()
+            self.size = 0
+
+    def _remove_(self, key:str) -> None:
+        entry = self.entries.pop(key)
+        self.size -= entry[4]
+        for table in entry[1]:
+            keys = self.tableKeys.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tableKeys[table]
+
+
+class SqlQueryStream:
+    def __init__(self, database:sqlite3.Connection, query:str, alternativeSql:Optional[Dict[str, str]]=None, batchSize:int=500, cache:Optional[QueryResultCache]=None,
+                 params:Optional[Union[list, tuple, dict]]=None, many:Optional[List[Union[list, tuple, dict]]]=None) -> None:
+        if alternativeSql:
+            query = Utils.convertQuery(query, alternativeSql)
+        self.database = database
+        self.query = query
+        self.batchSize = max(1, batchSize)
+        self.readOnly = many is None and Utils.isReadOnlyQuery(query)
+        self.rows = 0
+        self.cache = cache
+        self.cacheKey = None
+        self.cachedRows = None
+        self.cursor = None
+        self.resultRowcount = -1
+        self.resultLastrowid = None
+        if cache:
+            self.access = cache.analyze(query, many[0] if many else params)
+            if self.readOnly and self.access.cacheable:
+                self.cacheKey = QueryResultCache.normalize(query) if params is None else f'{QueryResultCache.normalize(query)}\0{params!r}'
+                self.cacheVersion = cache.currentVersion()
+                cached = cache.get(self.cacheKey)
+                if cached:
+                    self.columns, self.cachedRows = cached
+                    return
+        self.cursor = database.cursor()
+        try:
+            if many is not None:
+                self.cursor.executemany(query, many)
+            elif params is not None:
+                self.cursor.execute(query, params)
+            else:
+                self.cursor.execute(query)
+        except sqlite3.Error:
+            self._finish_(failed=True)
+            raise
+        self.columns = [column[0] for column in self.cursor.description or ()]
+
+    @classmethod
+    def fromRows(cls, columns:List[str], rows:List[tuple], batchSize:int=500, rowcount:int=-1, lastrowid:Optional[int]=None) -> 'SqlQueryStream':
+        stream = cls.__new__(cls)
+        stream.readOnly = True
+        stream.batchSize = max(1, batchSize)
+        stream.rows = 0
+        stream.cache = None
+        stream.cacheKey = None
+        stream.cursor = None
+        stream.columns = columns
+        stream.cachedRows = rows
+        stream.resultRowcount = rowcount
+        stream.resultLastrowid = lastrowid
+        return stream
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount if self.cursor else self.resultRowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self.cursor.lastrowid if self.cursor else self.resultLastrowid
+
+    def __iter__(self) -> Iterator[List[tuple]]:
+        if self.cachedRows is not None:
+            for index in range(0, len(self.cachedRows), self.batchSize):
+                rows = self.cachedRows[index:index+self.batchSize]
+                self.rows += len(rows)
+                yield rows
+            return
+        collected = [] if self.cacheKey else None
+        failed = True
+        try:
+            rows = self.cursor.fetchmany(self.batchSize)
+            while rows:
+                self.rows += len(rows)
+                if collected is not None:
+                    collected.extend(rows)
+                    if len(collected)>self.cache.maxRows:
+                        collected = None
+                yield rows
+                rows = self.cursor.fetchmany(self.batchSize)
+            if collected is not None:
+                self.cache.put(self.cacheKey, self.access.read, self.columns, collected, self.cacheVersion)
+            failed = False
+        finally:
+            self._finish_(failed)
+
+    def _finish_(self, failed:bool=False) -> None:
+        self.cursor.close()
+        if not self.readOnly and failed:
+            self.database.rollback()
+        elif not self.readOnly:
+            self.database.commit()
+            if self.cache and (self.access.schemaChanged or self.access.written):
+                self.cache.invalidate(None if self.access.schemaChanged else self.access.written)
+
+
+class SqlStatementSplitter:
+    blockSize = 1024*1024
+    statementRegex = re.compile(r"""(?:(?=([^;'"`\[\-/]+|'[^']*'|"[^"]*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/|-(?!-)|/(?!\*)))\1)*;""", re.DOTALL)
+    insertRegex = re.compile(r'^\s*((?:INSERT|REPLACE)(?:\s+OR\s+\w+)?\s+INTO\s+[^(;]+?(?:\([^()]*\))?\s*VALUES)\s*(?=\()', re.IGNORECASE)
+    literalPattern = r"(?:[-+]\s*)*(?:0x[0-9a-f]+|(?:\d+(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?)|'[^']*(?:''[^']*)*'|x'[0-9a-f]*'|NULL|TRUE|FALSE"
+    literalRowsRegex = re.compile(rf'\(\s*(?:{literalPattern})(?:\s*,\s*(?:{literalPattern}))*\s*\)(?:\s*,\s*\(\s*(?:{literalPattern})(?:\s*,\s*(?:{literalPattern}))*\s*\))*', re.IGNORECASE)
+
+    @staticmethod
+    def split(stream:TextIO) -> Iterator[str]:
+        pending, position = '', 0
+        while True:
+            block = stream.read(SqlStatementSplitter.blockSize)
+            if not block:
+                break
+            text, start = pending+block, 0
+            match = SqlStatementSplitter.statementRegex.match(text, position)
+            while match:
+                position = match.end()
+                statement = text[start:position]
+                if sqlite3.complete_statement(statement):
+                    statement = statement.strip()
+                    if statement!=';':
+                        yield statement
+                    start = position
+                match = SqlStatementSplitter.statementRegex.match(text, position)
+            pending, position = text[start:], position-start
+        pending = pending.strip()
+        if pending:
+            yield pending
+
+    @staticmethod
+    def insertShape(statement:str) -> Optional[Tuple[str, str]]:
+        match = SqlStatementSplitter.insertRegex.match(statement)
+        if not match:
+            return None
+        values = statement[match.end():].rstrip().rstrip(';').rstrip()
+        return (match.group(1), values) if SqlStatementSplitter.literalRowsRegex.fullmatch(values) else None
 
 
 class SqlFileLoader:
-    def __init__(self, path:str, files:Iterable[str]) -> None:
-        database = sqlite3.Connection(path)
+    STATEMENT = 0
+    INSERT = 1
+    END = 2
 
-        for file in files:
-            with open(file, 'r') as f:
-                queries = f.read()
-                for query in queries.split(';'):
-                    try:
-                        Utils.queryExecute(database, query)
-                    except Exception as e:
-                        print(repr(e))
+    maxGroupRows = 1000
+    queueSize = 256
+    putTimeout = 0.1
+    transactionKeywordRegex = re.compile(r'^\s*(BEGIN|COMMIT|END|ROLLBACK)\b(?!.*\bTO\b)', re.IGNORECASE | re.DOTALL)
+    outsideTransactionRegex = re.compile(r'^\s*(?:VACUUM|PRAGMA|ATTACH|DETACH)\b', re.IGNORECASE)
+
+    def __init__(self, path:str, files:Iterable[str], transactionSize:int=100000, wal:bool=False, unsafe:bool=False, jobs:int=2, progressInterval:float=5.0) -> None:
+        self.transactionSize = max(1, transactionSize)
+        self.progressInterval = progressInterval
+        self.fileTransaction = False
+        self.transactionChanges = 0
+        self.discardedChanges = 0
+        self.database = sqlite3.connect(path, isolation_level=None)
+        if wal:
+            self.database.execute('PRAGMA journal_mode=WAL')
+        if unsafe:
+            self.database.execute('PRAGMA synchronous=OFF')
+
+        files = list(files)
+        stop = threading.Event()
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix=f'{TOOL_NAME}-loader') as executor:
+                queues = [queue.Queue(self.queueSize) for _ in files]
+                for file, items in zip(files, queues):
+                    executor.submit(self._read_file_, file, items, stop)
+                try:
+                    for file, items in zip(files, queues):
+                        self._load_file_(file, items)
+                finally:
+                    stop.set()
+        finally:
+            self.database.close()
+
+    def _read_file_(self, file:str, items:queue.Queue, stop:threading.Event) -> None:
+        try:
+            for item in self._read_items_(file):
+                if not self._put_(items, item, stop):
+                    return
+        except Exception as e:
+            self._put_(items, (self.END, None, e), stop)
+        else:
+            self._put_(items, (self.END, None, None), stop)
+
+    def _read_items_(self, file:str) -> Iterator[Tuple[int, str, Optional[List[str]]]]:
+        with open(file, 'r') as f:
+            head, values = None, []
+            for statement in SqlStatementSplitter.split(f):
+                shape = SqlStatementSplitter.insertShape(statement)
+                if shape and shape[0]==head and len(values)<self.maxGroupRows:
+                    values.append(shape[1])
+                    continue
+                if values:
+                    yield self.INSERT, head, values
+                if shape:
+                    head, values = shape[0], [shape[1]]
+                else:
+                    head, values = None, []
+                    yield self.STATEMENT, statement, None
+            if values:
+                yield self.INSERT, head, values
+
+    def _put_(self, items:queue.Queue, item:tuple, stop:threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=self.putTimeout)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _load_file_(self, file:str, items:queue.Queue) -> None:
+        start = lastReport = time.monotonic()
+        startChanges = self.committedChanges = self.database.total_changes
+        self.discardedChanges = 0
+        while True:
+            kind, statement, payload = items.get()
+            if kind==self.END:
+                if payload:
+                    print(repr(payload))
+                break
+            try:
+                if kind==self.INSERT:
+                    self._execute_insert_(statement, payload)
+                else:
+                    self._execute_(statement)
+            except Exception as e:
+                print(repr(e))
+            if not self.fileTransaction and self.database.total_changes-self.committedChanges>=self.transactionSize:
+                self._commit_()
+            if self.progressInterval and time.monotonic()-lastReport>=self.progressInterval:
+                lastReport = time.monotonic()
+                self._report_(file, self.database.total_changes-startChanges-self.discardedChanges, lastReport-start)
+        self._commit_()
+        self._report_(file, self.database.total_changes-startChanges-self.discardedChanges, time.monotonic()-start)
+
+    def _execute_(self, statement:str) -> None:
+        self._check_transaction_()
+        transaction = self.transactionKeywordRegex.match(statement)
+        if transaction:
+            keyword = transaction.group(1).upper()
+            if keyword=='BEGIN':
+                self._commit_()
+                self.database.execute(statement)
+                self.fileTransaction = True
+                self.transactionChanges = self.database.total_changes
+            elif keyword in ('COMMIT', 'END'):
+                self._commit_()
+            elif self.fileTransaction:
+                self.database.execute(statement)
+                self._discard_transaction_()
+            return
+        if self.outsideTransactionRegex.match(statement):
+            if not self.fileTransaction:
+                self._commit_()
+        elif not self.database.in_transaction:
+            self.database.execute('BEGIN')
+        self.database.execute(statement)
+
+    def _execute_insert_(self, head:str, values:List[str]) -> None:
+        self._check_transaction_()
+        if not self.database.in_transaction:
+            self.database.execute('BEGIN')
+        if len(values)==1:
+            self.database.execute(f'{head} {values[0]}')
+            return
+        self.database.execute('SAVEPOINT bulk_insert')
+        try:
+            self.database.execute(f'{head} {", ".join(values[:-1])}')
+            self.database.execute(f'{head} {values[-1]}')
+        except sqlite3.Error:
+            self.database.execute('ROLLBACK TO bulk_insert')
+            for value in values:
+                try:
+                    self.database.execute(f'{head} {value}')
+                except sqlite3.Error as e:
+                    print(repr(e))
+        finally:
+            self.database.execute('RELEASE bulk_insert')
+
+    def _commit_(self) -> None:
+        if self.database.in_transaction:
+            self.database.execute('COMMIT')
+        self.fileTransaction = False
+        self.committedChanges = self.database.total_changes
+
+    def _check_transaction_(self) -> None:
+        if self.fileTransaction and not self.database.in_transaction:
+            self._discard_transaction_()
+
+    def _discard_transaction_(self) -> None:
+        self.discardedChanges += self.database.total_changes-self.transactionChanges
+        self.fileTransaction = False
+        self.committedChanges = self.database.total_changes
+
+    def _report_(self, file:str, rows:int, elapsed:float) -> None:
+        print(f'{file}: {rows} rows in {elapsed:.1f}s ({rows/elapsed if elapsed>0 else 0:.0f} rows/s)')
 
 
 class DataSetting:
@@ -248,198 +839,2090 @@ if __name__=='__main__':
     parser.add_argument('-db', '--database', metavar='database_path', default='database.db', help='Specific path of database.db (Default is "./database.db")')
     parser.add_argument('-c', '--console', action='store_true', help='Start program in ConsoleMode')
     parser.add_argument('-ac', '--console-auto-complete', action='store_true', help='Autocomplete command in ConsoleMode')
+    parser.add_argument('-cp', '--console-page-size', metavar='rows', type=int, default=0, help='Rows per page of SELECT tables in ConsoleMode (Default is 0, fit the terminal)')
     parser.add_argument('-s', '--server', nargs='?', type=Utils.validateAddress, metavar='address:port', help='Start program in ServerMode (Default is 0.0.0.0:5500)')
     parser.add_argument('-sf', '--server-file-log', nargs='?', metavar='filelog_path', help='Specific logfile in ServerMode (Default is disabled)')
+    parser.add_argument('-slf', '--server-log-format', choices=('text', 'json'), default='text', help='Format of the logfile: text lines or JSON lines (Default is text)')
+    parser.add_argument('-slr', '--server-log-rotate', metavar='MiB', type=float, default=0.0, help='Rotate the logfile when it grows over this size (Default is 0, never)')
+    parser.add_argument('-slb', '--server-log-backups', metavar='files', type=int, default=5, help='Rotated logfiles to keep (Default is 5)')
+    parser.add_argument('-sls', '--server-log-sample', metavar='rate', type=float, default=1.0, help='Fraction of query logs to keep, errors are always kept (Default is 1.0)')
+    parser.add_argument('-sll', '--server-log-limit', metavar='records/s', type=float, default=0.0, help='Maximum query logs per second, errors are always kept (Default is 0, unlimited)')
     parser.add_argument('-sb', '--server-buffer-size', nargs='?', metavar='buffer_size', type=int, default=1024, help='Spacific size of socket buffer')
+    parser.add_argument('-sw', '--server-workers', metavar='workers', type=int, default=16, help='Number of worker threads executing queries in ServerMode (Default is 16)')
+    parser.add_argument('-se', '--server-backend', choices=('thread', 'asyncio'), default='thread', help='Execution model of ServerMode: thread pool or asyncio event loop (Default is thread)')
+    parser.add_argument('-sp', '--server-pool-size', metavar='connections', type=int, help='Maximum number of pooled database connections in ServerMode (Default is --server-workers)')
+    parser.add_argument('-spi', '--server-pool-idle', metavar='seconds', type=float, default=300.0, help='Close pooled connections idle for longer than this (Default is 300)')
+    parser.add_argument('-spp', '--server-pragma', metavar='name=value', action='append', help='PRAGMA applied to every pooled connection, can be repeated (e.g. cache_size=-64000)')
+    parser.add_argument('-ssc', '--server-statement-cache', metavar='statements', type=int, default=128, help='Size of the prepared statement cache of each pooled connection (Default is 128)')
+    parser.add_argument('-sqt', '--server-query-timeout', metavar='seconds', type=float, default=0.0, help='Interrupt queries running for longer than this, clients may ask for less (Default is 0, no limit)')
+    parser.add_argument('-sbt', '--server-busy-timeout', metavar='seconds', type=float, default=5.0, help='Time a pooled connection waits for a locked database before failing (Default is 5)')
+    parser.add_argument('-sbr', '--server-busy-retries', metavar='retries', type=int, default=3, help='Retries of a statement that failed because the database was locked (Default is 3)')
+    parser.add_argument('-sq', '--server-queue', metavar='requests', type=int, default=0, help='Reject requests with a busy error when this many are already waiting for a worker or for the database (Default is 0, unbounded)')
+    parser.add_argument('-swal', '--server-wal', action='store_true', help='Switch to WAL, run reads on read-only connections and writes on a single group-committing writer')
+    parser.add_argument('-sgc', '--server-group-commit', metavar='statements', type=int, default=64, help='Maximum queued writes committed together by the WAL writer (Default is 64)')
+    parser.add_argument('-swc', '--server-wal-checkpoint', metavar='seconds', type=float, default=10.0, help='Interval of background WAL checkpoints, 0 keeps SQLite automatic checkpoints (Default is 10)')
+    parser.add_argument('-sk', '--server-keep-alive', metavar='seconds', type=float, default=0.0, help='Keep client sockets open for many queries, closing after this idle time (Default is 0, one query per connection)')
+    parser.add_argument('-qc', '--query-cache', metavar='entries', nargs='?', type=int, const=1024, help='Cache results of read-only queries, invalidated when a write touches their tables (Default is disabled, 1024 entries if no value)')
+    parser.add_argument('-qct', '--query-cache-ttl', metavar='seconds', type=float, default=60.0, help='Seconds a cached result stays valid (Default is 60)')
+    parser.add_argument('-qcm', '--query-cache-memory', metavar='MiB', type=float, default=64.0, help='Approximate memory bound of the query cache (Default is 64)')
+    parser.add_argument('-qcr', '--query-cache-rows', metavar='rows', type=int, default=10000, help='Results with more rows are not cached (Default is 10000)')
     parser.add_argument('-j', '--json', action='store_true', help='Specific if encode output to JSON format')
+    parser.add_argument('-nj', '--ndjson', action='store_true', help='Specific if encode output to newline delimited JSON, one row per line')
+    parser.add_argument('-fb', '--fetch-batch-size', metavar='rows', type=int, default=500, help='Rows fetched from the cursor and encoded at a time (Default is 500)')
     parser.add_argument('-f', '--file', metavar='path.sql', nargs='*', help="Load file's querys on database (Files are loads before start Console or Server Modes)")
+    parser.add_argument('-ft', '--file-transaction-size', metavar='rows', type=int, default=100000, help='Rows changed by loaded files before each commit (Default is 100000)')
+    parser.add_argument('-fw', '--file-wal', action='store_true', help='Switch the database to journal_mode=WAL before loading files')
+    parser.add_argument('-fu', '--file-unsafe', action='store_true', help='Load files with synchronous=OFF (Faster, but the database may be corrupted on power loss)')
+    parser.add_argument('-fj', '--file-jobs', metavar='jobs', type=int, default=2, help='Files read and parsed ahead in parallel while loading (Default is 2)')
+    parser.add_argument('-fp', '--file-progress', metavar='seconds', type=float, default=5.0, help='Interval of rows/s progress reports while loading files, 0 to disable (Default is 5)')
     parser.add_argument('-d', '--dictionary-json', metavar='file.json', nargs='?', help='Load file for traslating SQL query into alternative lenguage')
 
     args = parser.parse_args(sys.argv[1:])
+    args.output_format = 'ndjson' if args.ndjson else 'json' if args.json else 'str'
 
     DataSetting.alternativeSql = Utils.getDictFromJsonFile(args.dictionary_json) if args.dictionary_json else None
 
 
 
-class SqlConsoleStyle(Style):
-    styles = {
-        Keyword: DataSetting.getColor('keyword'),
-        Name: DataSetting.getColor('name'),
-        Operator: DataSetting.getColor('operator'),
-        Punctuation: DataSetting.getColor('punctuation'),
-        String: DataSetting.getColor('string'),
-        Comment: DataSetting.getColor('comment')
-    }
+class SqlPrefixIndex:
+    def __init__(self, words:Iterable[str]) -> None:
+        unique = {}
+        for word in words:
+            unique.setdefault(word.lower(), word)
+        self.keys = sorted(unique)
+        self.words = [unique[key] for key in self.keys]
 
+    def find(self, prefix:str) -> Tuple[Optional[str], int]:
+        prefix = prefix.lower()
+        low = bisect_left(self.keys, prefix)
+        if low<len(self.keys) and self.keys[low]==prefix:
+            low += 1
+        high = bisect_left(self.keys, prefix+'\U0010ffff', low)
+        return (self.words[low] if high>low else None), high-low
 
-class SqlConsoleLexer(RegexLexer):
-    tokens = {
-        'root': [
-            (Utils.listToRegex(DataSetting.getKeywords()), Keyword),
-            (r'\d+', Number),
-            (r'"([^"\\]|\\.)*"|\'([^"\\]|\\.)*\'', String),
-            (r'\s+', Whitespace),
-            (r'\w+', Text),
-            (r'[\(\)\[\]\{\};,]', Punctuation),
-            #(r'', Name),
-            (r'--.*$|/\*.*?\*/|\{-(.*?)-\}', Comment)
-        ]
-    }
 
+class SqlSchemaCatalog:
+    contextRegex = re.compile(r'\b(SELECT|DISTINCT|WHERE|AND|OR|NOT|ON|BY|SET|HAVING|WHEN|THEN|ELSE|FROM|JOIN|INTO|UPDATE|TABLE)\b', re.IGNORECASE)
+    tableReferenceRegex = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+([\w$]+)', re.IGNORECASE)
+    qualifierRegex = re.compile(r'([\w$]+)\.$')
+    tableContexts = ('FROM', 'JOIN', 'INTO', 'UPDATE', 'TABLE')
+
+    def __init__(self, database:Optional[sqlite3.Connection], keywords:Iterable[str], alternativeSql:Optional[Dict[str, str]]=None) -> None:
+        self.database = database
+        self.alternativeSql = alternativeSql
+        self.keywords = SqlPrefixIndex(keywords)
+        self.tables = SqlPrefixIndex(())
+        self.columns = SqlPrefixIndex(())
+        self.tableColumns = {}
+        self.schemaVersion = None
+
+    def refresh(self) -> None:
+        if self.database is None:
+            return
+        try:
+            schemaVersion = self.database.execute('PRAGMA schema_version').fetchone()[0]
+            if schemaVersion==self.schemaVersion:
+                return
+            schema = Utils.getDatabaseSchema(self.database)
+        except sqlite3.Error:
+            return
+        self.tables = SqlPrefixIndex(schema)
+        self.columns = SqlPrefixIndex(column for columns in schema.values() for column in columns)
+        self.tableColumns = {table.lower(): columns for table, columns in schema.items()}
+        self.schemaVersion = schemaVersion
+
+    def suggest(self, textBeforeCursor:str, word:str) -> Tuple[Optional[str], int]:
+        self.refresh()
+        text = textBeforeCursor[:len(textBeforeCursor)-len(word)]
+        if self.alternativeSql:
+            text = Utils.convertQuery(text, self.alternativeSql)
+        qualifier = self.qualifierRegex.search(text)
+        if qualifier and qualifier.group(1).lower() in self.tableColumns:
+            indexes = [(SqlPrefixIndex(self.tableColumns[qualifier.group(1).lower()]), False)]
+        else:
+            context = None
+            for context in self.contextRegex.finditer(text):
+                pass
+            context = context.group(1).upper() if context else None
+            if context in self.tableContexts:
+                indexes = [(self.tables, False), (self.keywords, True)]
+            elif context:
+                scoped = SqlPrefixIndex(column for table in self.tableReferenceRegex.findall(textBeforeCursor) for column in self.tableColumns.get(table.lower(), ()))
+                indexes = [(scoped if scoped.find(word)[0] is not None else self.columns, False), (self.keywords, True), (self.tables, False)]
+            else:
+                indexes = [(self.keywords, True), (self.tables, False), (self.columns, False)]
+        best, total = None, 0
+        for index, keyword in indexes:
+            match, count = index.find(word)
+            if best is None and match is not None:
+                best = match.lower() if keyword and not match.startswith(word) else match
+            total += count
+            if total>1 and best is not None:
+                break
+        return best, total
+
+
+class SqlConsoleComponents:
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def keywordRegex(keywords:Tuple[str, ...]) -> str:
+        return Utils.listToRegex(keywords)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def lexer(keywords:Tuple[str, ...]) -> type:
+        from pygments.lexer import RegexLexer
+        from pygments.token import Keyword, Punctuation, String, Text, Whitespace, Number, Comment
+
+        class SqlConsoleLexer(RegexLexer):
+            tokens = {
+                'root': [
+                    (SqlConsoleComponents.keywordRegex(keywords), Keyword),
+                    (r'\d+', Number),
+                    (r'"([^"\\]|\\.)*"|\'([^"\\]|\\.)*\'', String),
+                    (r'\s+', Whitespace),
+                    (r'\w+', Text),
+                    (r'[\(\)\[\]\{\};,]', Punctuation),
+                    #(r'', Name),
+                    (r'--.*$|/\*.*?\*/|\{-(.*?)-\}', Comment)
+                ]
+            }
+
+        return SqlConsoleLexer
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def style() -> type:
+        from pygments.style import Style
+        from pygments.token import Keyword, Name, Operator, Punctuation, String, Comment
+
+        class SqlConsoleStyle(Style):
+            styles = {
+                Keyword: DataSetting.getColor('keyword'),
+                Name: DataSetting.getColor('name'),
+                Operator: DataSetting.getColor('operator'),
+                Punctuation: DataSetting.getColor('punctuation'),
+                String: DataSetting.getColor('string'),
+                Comment: DataSetting.getColor('comment')
+            }
 
-class SqlConsoleAutoSuggester(AutoSuggest):
-    def __init__(self, autoComplete:bool) -> None:
-        self.autoComplete = autoComplete
-        super().__init__()
-
-    def get_suggestion(self, buffer:Buffer, document:Document) -> Optional[Suggestion]:
-        word = document.get_word_before_cursor()
-        suggestions = []
-        if len(word)>0:
-            for keyword in DataSetting.getKeywords():
-                if keyword.startswith(word):
-                    suggestions.append(Suggestion(keyword[len(word):]))
-                elif keyword.lower().startswith(word):
-                    suggestions.append(Suggestion(keyword[len(word):].lower()))
-            if len(suggestions)==1 and self.autoComplete:
-                buffer.insert_text(suggestions[0].text)
+        return SqlConsoleStyle
+
+    @staticmethod
+    def autoSuggester(autoComplete:bool, catalog:'SqlSchemaCatalog') -> 'AutoSuggest':
+        return SqlConsoleComponents.autoSuggesterClass()(autoComplete, catalog)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def autoSuggesterClass() -> type:
+        from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
+
+        class SqlConsoleAutoSuggester(AutoSuggest):
+            def __init__(self, autoComplete:bool, catalog:SqlSchemaCatalog) -> None:
+                self.autoComplete = autoComplete
+                self.catalog = catalog
+                super().__init__()
+
+            def get_suggestion(self, buffer, document) -> Optional[Suggestion]:
+                word = document.get_word_before_cursor()
+                if len(word)>0 and (word[0].isalnum() or word[0] in '_$'):
+                    completion, count = self.catalog.suggest(document.text_before_cursor, word)
+                    if completion is None:
+                        return None
+                    if count==1 and self.autoComplete:
+                        buffer.insert_text(completion[len(word):])
+                        return None
+                    return Suggestion(completion[len(word):])
                 return None
-            return suggestions[0] if len(suggestions)>0 else None
-        return None
+
+        return SqlConsoleAutoSuggester
 
 
 class ConsoleMode:
-    def __init__(self, path:str, toJson:bool, autoComplete:bool, alternativeSqlFile:Union[Dict[str, str], None]) -> None:
-        self.console = Console()
+    exportFormats = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+    maxColumnWidth = 60
+
+    def __init__(self, path:str, outputFormat:str, autoComplete:bool, alternativeSqlFile:Union[Dict[str, str], None], batchSize:int=500, cache:Optional[QueryResultCache]=None, pageSize:int=0) -> None:
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.lexers import PygmentsLexer
+        from prompt_toolkit.styles import style_from_pygments_cls
+        self.console = Utils.createConsole()
         self.alternativeSql = Utils.getDictFromJsonFile(alternativeSqlFile) if alternativeSqlFile else None
-        self.promptSession = PromptSession('>>> ',
-            lexer=PygmentsLexer(SqlConsoleLexer),
-            style=style_from_pygments_cls(SqlConsoleStyle),
-            auto_suggest=SqlConsoleAutoSuggester(autoComplete=autoComplete),
-            vi_mode=True
-        )
-        self.toJson = toJson
+        self.outputFormat = outputFormat
+        self.batchSize = batchSize
+        self.pageSize = pageSize
+        self.cache = cache
+        self.database = None
         try:
             self.database = sqlite3.connect(path)
         except sqlite3.Error as e:
             self.console.print(repr(e))
+        keywords = tuple(DataSetting.getKeywords())
+        self.catalog = SqlSchemaCatalog(self.database, keywords, self.alternativeSql)
+        self.promptSession = PromptSession('>>> ',
+            lexer=PygmentsLexer(SqlConsoleComponents.lexer(keywords)),
+            style=style_from_pygments_cls(SqlConsoleComponents.style()),
+            auto_suggest=SqlConsoleComponents.autoSuggester(autoComplete=autoComplete, catalog=self.catalog),
+            vi_mode=True
+        )
 
     def run(self) -> None:
         running = True
         Utils.printHeader(self.console, 'ConsoleMode')
-        self.console.print("('_clear' for clear console, '_exit' for exit)")
+        self.console.print("('_clear' for clear console, '_cache [clear]' for query cache statistics, '_export file.csv|file.ndjson query' for export, '_exit' for exit)", markup=False)
         while running:
-            query = self.promptSession.prompt()
+            try:
+                query = self.promptSession.prompt()
+            except KeyboardInterrupt:
+                continue
+            except EOFError:
+                break
             if query=='_clear':
                 self.console.clear()
             elif query=='_exit':
                 running = False
-            else:
-                try:
-                    result = Utils.queryExecute(self.database, query, self.alternativeSql, self.toJson)
-                    if self.toJson:
-                        self.console.print_json(result)
-                    else:
-                        self.console.print(result)
-                except sqlite3.Error as e:
-                    self.console.print(repr(e))
+            elif query.split()[:1]==['_cache']:
+                self._print_stream_(Utils.cacheCommand(self.cache, query, self.batchSize))
+            elif query.split()[:1]==['_export']:
+                self._export_(query)
+            elif query.strip():
+                self._run_query_(query)
         self.database.close()
+        if self.cache:
+            self.cache.close()
+
+    def _run_query_(self, query:str) -> None:
+        guard = SqlQueryGuard(cancellable=True)
+        paged = self.outputFormat=='str'
+        try:
+            with self._cancellable_(guard):
+                stream = SqlQueryStream(self.database, query, self.alternativeSql, self._page_size_() if paged else self.batchSize, self.cache)
+            if paged:
+                self._print_table_(stream, guard)
+            else:
+                self._print_stream_(stream, guard)
+        except (sqlite3.Error, QueryCancelledError) as e:
+            self.console.print('Query cancelled' if guard.cancelled else repr(e))
+        except KeyboardInterrupt:
+            self.console.print('Query cancelled')
+
+    def _print_stream_(self, stream:SqlQueryStream, guard:Optional['SqlQueryGuard']=None) -> None:
+        chunk = '\n'
+        for chunk in Utils.encodeStream(self._batches_(stream, guard), self.outputFormat):
+            self.console.out(chunk, end='')
+        if not chunk.endswith('\n'):
+            self.console.out('')
+
+    def _print_table_(self, stream:SqlQueryStream, guard:'SqlQueryGuard') -> None:
+        from rich.table import Table
+        from rich.text import Text as RichText
+        batches = self._batches_(stream, guard)
+        try:
+            if not stream.columns:
+                for _ in batches:
+                    pass
+                self.console.print(f'OK, {stream.rowcount} rows changed' if stream.rowcount>=0 else 'OK')
+                return
+            widths = [min(len(column), self.maxColumnWidth) for column in stream.columns]
+            justify = None
+            shown = 0
+            for rows in batches:
+                if justify is None:
+                    justify = ['right' if all(isinstance(row[index], (int, float)) for row in rows if row[index] is not None) else 'left' for index in range(len(stream.columns))]
+                cells = [[self._cell_(value) for value in row] for row in rows]
+                for row in cells:
+                    widths = [max(width, min(len(cell.plain), self.maxColumnWidth)) for width, cell in zip(widths, row)]
+                table = Table(show_edge=False, header_style='bold', row_styles=('', 'dim') if len(rows)>4 else None)
+                for column, width, side in zip(stream.columns, widths, justify):
+                    table.add_column(RichText(column), justify=side, min_width=width, max_width=self.maxColumnWidth, no_wrap=True, overflow='ellipsis')
+                for row in cells:
+                    table.add_row(*row)
+                self.console.print(table)
+                shown += len(rows)
+                if len(rows)==stream.batchSize and self.console.is_terminal:
+                    answer = self.console.input(f'[dim]-- rows {shown-len(rows)+1}-{shown}, Enter for more, q to stop --[/dim] ')
+                    if answer.strip().lower().startswith('q'):
+                        if not stream.readOnly:
+                            for _ in batches:
+                                pass
+                        return
+            self.console.print(f'[dim]{shown} rows[/dim]')
+        finally:
+            batches.close()
+
+    def _export_(self, command:str) -> None:
+        parts = command.split(None, 2)
+        exportFormat = self.exportFormats.get(os.path.splitext(parts[1])[1].lower()) if len(parts)==3 else None
+        if exportFormat is None:
+            self.console.print(f'Usage: _export file{"|file".join(self.exportFormats)} query')
+            return
+        path, query = parts[1], parts[2]
+        guard = SqlQueryGuard(cancellable=True)
+        start = time.monotonic()
+        rows = 0
+        try:
+            with self._cancellable_(guard):
+                stream = SqlQueryStream(self.database, query, self.alternativeSql, self.batchSize, self.cache)
+            batches = self._batches_(stream, guard)
+            try:
+                import csv
+                with open(path, 'w', newline='', encoding='utf-8') as file:
+                    writer = csv.writer(file) if exportFormat=='csv' else None
+                    if writer:
+                        writer.writerow(stream.columns)
+                    for batch in batches:
+                        if writer:
+                            writer.writerows([value.hex() if isinstance(value, bytes) else value for value in row] for row in batch)
+                        else:
+                            file.write(''.join(Utils.jsonEncoder.encode(row)+'\n' for row in batch))
+                        rows += len(batch)
+            finally:
+                batches.close()
+        except (sqlite3.Error, OSError, QueryCancelledError, KeyboardInterrupt) as e:
+            cancelled = guard.cancelled or isinstance(e, KeyboardInterrupt)
+            self.console.print(f'Export cancelled after {rows} rows, {path} is incomplete' if cancelled else repr(e))
+            return
+        self.console.print(f'{rows} rows exported to {path} in {time.monotonic()-start:.1f}s')
+
+    def _batches_(self, stream:SqlQueryStream, guard:Optional['SqlQueryGuard']) -> Iterator[List[tuple]]:
+        batches = iter(stream)
+        try:
+            while True:
+                with self._cancellable_(guard) if guard else nullcontext():
+                    rows = next(batches, None)
+                if rows is None:
+                    return
+                yield rows
+        finally:
+            batches.close()
+
+    @contextmanager
+    def _cancellable_(self, guard:'SqlQueryGuard') -> Iterator[None]:
+        import signal
+        previous = signal.signal(signal.SIGINT, lambda signum, frame: self._interrupt_(guard))
+        guard.attach(self.database, 0.0)
+        try:
+            yield
+        finally:
+            guard.detach()
+            signal.signal(signal.SIGINT, previous)
+
+    def _interrupt_(self, guard:'SqlQueryGuard') -> None:
+        guard.cancelled = True
+        self.database.interrupt()
+
+    def _page_size_(self) -> int:
+        return self.pageSize if self.pageSize>0 else max(5, self.console.size.height-6)
+
+    @staticmethod
+    def _cell_(value:Any) -> Any:
+        from rich.text import Text as RichText
+        if value is None:
+            return RichText('NULL', style='dim italic')
+        if isinstance(value, bytes):
+            return RichText(f'<{len(value)} bytes>', style='dim')
+        return RichText(str(value))
 
 
 class SqlServerLogger:
-    def __init__(self, console:Console, log_to_file:bool=False, log_file_name:str='logfile.log') -> None:
+    levels = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+    sampledLevels = ('DEBUG', 'INFO')
+    styles = {'WARNING': 'yellow', 'ERROR': 'red', 'CRITICAL': 'red'}
+
+    def __init__(self, console:Optional['Console']=None, log_to_file:bool=False, log_file_name:str='logfile.log', logFormat:str='text', maxBytes:int=0, backupCount:int=5,
+                 sampleRate:float=1.0, rateLimit:float=0.0, queueSize:int=10000, batchSize:int=256, flushInterval:float=0.5, toConsole:bool=True) -> None:
         self.console = console
         self.log_to_file = log_to_file
         self.log_file_name = log_file_name
+        self.logFormat = logFormat
+        self.maxBytes = maxBytes
+        self.backupCount = max(0, backupCount)
+        self.sampleRate = sampleRate
+        self.rateLimit = rateLimit
+        self.batchSize = max(1, batchSize)
+        self.flushInterval = flushInterval
+        self.toConsole = toConsole
+        self.tokens = max(1.0, rateLimit)
+        self.tokensUpdated = time.monotonic()
+        self.dropped = 0
+        self.sampleCounter = 0
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=max(1, queueSize))
+        self.file = open(self.log_file_name, 'a', encoding='utf-8') if self.log_to_file else None
+        self.fileSize = self.file.tell() if self.file else 0
+        self.writer = threading.Thread(target=self._write_loop_, name='SqlServerLogger', daemon=True)
+        self.writer.start()
 
-        if self.log_to_file:
-            logging.basicConfig(filename=self.log_file_name, level=logging.DEBUG, format='[%(asctime)s] %(levelname)s %(message)s')
-    
     def logDebug(self, message:str, header:str=None) -> None:
         self._log_('DEBUG', message, header)
-        if self.log_to_file:
-            logging.debug(self._create_message_(message, header))
 
     def logInfo(self, message:str, header:str=None) -> None:
         self._log_('INFO', message, header)
-        if self.log_to_file:
-            logging.info(self._create_message_(message, header))
 
     def logWarning(self, message:str, header:str=None) -> None:
-        self._log_('WARNING', message, header, 'yellow')
-        if self.log_to_file:
-            logging.warning(self._create_message_(message, header))
+        self._log_('WARNING', message, header)
 
     def logError(self, message:str, header:str=None) -> None:
-        self._log_('ERROR', message, header, 'red')
-        if self.log_to_file:
-            logging.error(self._create_message_(message, header))
+        self._log_('ERROR', message, header)
     
     def logCritical(self, message:str, header:str=None) -> None:
-        self._log_('CRITICAL', message, header, 'red')
-        if self.log_to_file:
-            logging.critical(self._create_message_(message, header))
+        self._log_('CRITICAL', message, header)
+
+    def close(self) -> None:
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _log_(self, level_name:str, message:str, header:str=None) -> None:
+        if level_name in self.sampledLevels and not self._admit_():
+            return
+        try:
+            self.queue.put_nowait((time.time(), level_name, header, message))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def _admit_(self) -> bool:
+        with self.lock:
+            if self.sampleRate<1.0:
+                self.sampleCounter += self.sampleRate
+                if self.sampleCounter<1.0:
+                    self.dropped += 1
+                    return False
+                self.sampleCounter -= 1.0
+            if self.rateLimit>0:
+                now = time.monotonic()
+                self.tokens = min(max(1.0, self.rateLimit), self.tokens+(now-self.tokensUpdated)*self.rateLimit)
+                self.tokensUpdated = now
+                if self.tokens<1.0:
+                    self.dropped += 1
+                    return False
+                self.tokens -= 1.0
+            return True
+
+    def _write_loop_(self) -> None:
+        running = True
+        while running:
+            try:
+                records = [self.queue.get(timeout=self.flushInterval)]
+            except queue.Empty:
+                records = []
+            while records and len(records)<self.batchSize:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in records:
+                running = False
+                records = [record for record in records if record is not None]
+                while True:
+                    try:
+                        record = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if record is not None:
+                        records.append(record)
+            with self.lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                records.append((time.time(), 'WARNING', None, f'{dropped} log records dropped by sampling, rate limit or a full queue'))
+            if records:
+                try:
+                    self._write_(records)
+                except Exception as e:
+                    sys.stderr.write(f'SqlServerLogger: {e!r}\n')
+
+    def _write_(self, records:List[tuple]) -> None:
+        if self.toConsole:
+            from rich.text import Text as RichText
+            if self.console is None:
+                self.console = Utils.createConsole()
+            self.console.print(*(RichText(f'[{datetime.fromtimestamp(created)}] {level_name} {self._create_message_(message, header)}', style=self.styles.get(level_name, ''))
+                                 for created, level_name, header, message in records), sep='\n')
+        if self.file:
+            lines = []
+            for record in records:
+                line = self._format_record_(record)
+                size = len(line.encode('utf-8'))
+                if self.maxBytes>0 and self.fileSize>0 and self.fileSize+size>self.maxBytes:
+                    self.file.write(''.join(lines))
+                    self._rotate_()
+                    lines = []
+                lines.append(line)
+                self.fileSize += size
+            self.file.write(''.join(lines))
+            self.file.flush()
 
-    def _log_(self, level_name:str, message:str, header:str=None, style:str=None) -> None:
-        message = self._create_message_(message, header)
-        self.console.print(f'[{datetime.now()}] {level_name} {message}', style=style)
+    def _format_record_(self, record:tuple) -> str:
+        created, level_name, header, message = record
+        if self.logFormat=='json':
+            return json.dumps({'time': datetime.fromtimestamp(created).isoformat(), 'level': level_name, 'client': header, 'message': message})+'\n'
+        return f'[{datetime.fromtimestamp(created).isoformat(sep=" ", timespec="milliseconds")}] {level_name} {self._create_message_(message, header)}\n'
+
+    def _rotate_(self) -> None:
+        self.file.close()
+        if self.backupCount>0:
+            for index in range(self.backupCount-1, 0, -1):
+                if os.path.exists(f'{self.log_file_name}.{index}'):
+                    os.replace(f'{self.log_file_name}.{index}', f'{self.log_file_name}.{index+1}')
+            os.replace(self.log_file_name, f'{self.log_file_name}.1')
+        self.file = open(self.log_file_name, 'w', encoding='utf-8')
+        self.fileSize = 0
     
     def _create_message_(self, message:str, header:str=None) -> None:
         header = header+' ' if header else ''
         return f'{header}-> {message}'
 
 
+class SqlConnectionPool:
+    def __init__(self, path:str, maxSize:int, minSize:int=1, pragmas:Optional[Iterable[str]]=None, idleTimeout:float=300.0, healthCheckInterval:float=30.0, cachedStatements:int=128, busyTimeout:float=5.0, readOnly:bool=False) -> None:
+        self.path = path
+        self.readOnly = readOnly
+        self.maxSize = max(1, maxSize)
+        self.minSize = min(max(0, minSize), self.maxSize)
+        self.pragmas = list(pragmas) if pragmas else []
+        self.idleTimeout = idleTimeout
+        self.healthCheckInterval = healthCheckInterval
+        self.cachedStatements = max(0, cachedStatements)
+        self.busyTimeout = max(0.0, busyTimeout)
+        self.idle = deque()
+        self.size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        for _ in range(self.minSize):
+            self.idle.append((self._open_(), time.monotonic()))
+            self.size += 1
+        self.reaper = threading.Thread(target=self._reap_, name=f'{TOOL_NAME}-pool-reaper', daemon=True)
+        self.reaper.start()
+
+    def acquire(self, timeout:Optional[float]=None) -> sqlite3.Connection:
+        deadline = time.monotonic()+timeout if timeout is not None else None
+        while True:
+            with self.condition:
+                while not self.idle and self.size>=self.maxSize and not self.closed:
+                    remaining = deadline-time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining<=0:
+                        raise TimeoutError('No free database connection in pool')
+                    self.condition.wait(remaining)
+                if self.closed:
+                    raise sqlite3.ProgrammingError('Connection pool is closed')
+                if self.idle:
+                    connection, lastUsed = self.idle.pop()
+                else:
+                    self.size += 1
+                    connection, lastUsed = None, None
+            if connection is None:
+                try:
+                    return self._open_()
+                except sqlite3.Error:
+                    self._forget_()
+                    raise
+            if time.monotonic()-lastUsed<self.healthCheckInterval or self._is_healthy_(connection):
+                return connection
+            self._discard_(connection)
+
+    def release(self, connection:sqlite3.Connection) -> None:
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            self._discard_(connection)
+            return
+        with self.condition:
+            if self.closed:
+                connection.close()
+                self.size -= 1
+                return
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self, timeout:Optional[float]=None) -> Iterator[sqlite3.Connection]:
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            while self.idle:
+                self.idle.popleft()[0].close()
+                self.size -= 1
+            self.condition.notify_all()
+
+    def _open_(self) -> sqlite3.Connection:
+        if self.readOnly:
+            from urllib.parse import quote
+            connection = sqlite3.connect(f'file:{quote(os.path.abspath(self.path))}?mode=ro', uri=True, timeout=self.busyTimeout, check_same_thread=False, cached_statements=self.cachedStatements)
+        else:
+            connection = sqlite3.connect(self.path, timeout=self.busyTimeout, check_same_thread=False, cached_statements=self.cachedStatements)
+        for pragma in self.pragmas:
+            connection.execute(f'PRAGMA {pragma}')
+        return connection
+
+    def _is_healthy_(self, connection:sqlite3.Connection) -> bool:
+        try:
+            connection.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard_(self, connection:sqlite3.Connection) -> None:
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+        self._forget_()
+
+    def _forget_(self) -> None:
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def _reap_(self) -> None:
+        while not self.closed:
+            time.sleep(max(1.0, self.idleTimeout/2))
+            expired = []
+            with self.condition:
+                limit = time.monotonic()-self.idleTimeout
+                while self.idle and self.size>self.minSize and self.idle[0][1]<limit:
+                    expired.append(self.idle.popleft()[0])
+                    self.size -= 1
+            for connection in expired:
+                connection.close()
+
+
+class QueryTimeoutError(TimeoutError):
+    pass
+
+
+class QueryCancelledError(RuntimeError):
+    pass
+
+
+class ServerBusyError(RuntimeError):
+    pass
+
+
+class SqlQueryGuard:
+    progressSteps = 1000
+
+    def __init__(self, timeout:Optional[float]=None, client:str='', query:str='', cancellable:bool=False) -> None:
+        self.id = None
+        self.cancellable = cancellable
+        self.timeout = timeout
+        self.client = client
+        self.query = query
+        self.started = time.monotonic()
+        self.deadline = self.started+timeout if timeout else None
+        self.cancelled = False
+        self.database = None
+        self.busyTimeout = None
+        self.lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        return max(0.0, self.deadline-time.monotonic()) if self.deadline is not None else None
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic()>=self.deadline
+
+    def attach(self, database:sqlite3.Connection, busyTimeout:float) -> None:
+        with self.lock:
+            if self.cancelled:
+                raise self.error()
+            self.database = database
+        if self.deadline is None and not self.cancellable:
+            return
+        database.set_progress_handler(self, self.progressSteps)
+        remaining = self.remaining()
+        if remaining is not None and remaining<busyTimeout:
+            database.execute(f'PRAGMA busy_timeout={int(remaining*1000)}')
+            self.busyTimeout = busyTimeout
+
+    def detach(self) -> None:
+        with self.lock:
+            database, self.database = self.database, None
+        if database is None or (self.deadline is None and not self.cancellable):
+            return
+        database.set_progress_handler(None, 0)
+        if self.busyTimeout is not None:
+            database.execute(f'PRAGMA busy_timeout={int(self.busyTimeout*1000)}')
+
+    def cancel(self) -> bool:
+        with self.lock:
+            self.cancelled = True
+            if self.database is not None:
+                self.database.interrupt()
+        return True
+
+    def error(self) -> Exception:
+        if self.cancelled:
+            return QueryCancelledError('Query cancelled')
+        return QueryTimeoutError(f'Query exceeded its {self.timeout:g}s deadline')
+
+    def fired(self) -> bool:
+        return self.cancelled or self.expired()
+
+    def __call__(self) -> int:
+        return self.cancelled or (self.deadline is not None and time.monotonic()>=self.deadline)
+
+
+class SqlWriteJob:
+    __slots__ = ('query', 'params', 'many', 'guard', 'future', 'submitted', 'started', 'finished')
+
+    def __init__(self, query:str, params:Optional[Union[list, dict]], many:Optional[list], guard:SqlQueryGuard) -> None:
+        self.query = query
+        self.params = params
+        self.many = many
+        self.guard = guard
+        from concurrent.futures import Future
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+
+
+class SqlGroupCommitWriter:
+    savepoint = 'pulseql_write'
+
+    def __init__(self, path:str, pragmas:Optional[Iterable[str]]=None, busyTimeout:float=5.0, busyRetries:int=3, maxBatch:int=64, checkpointInterval:float=10.0, metrics:Optional['ServerMetrics']=None) -> None:
+        self.path = path
+        self.busyTimeout = busyTimeout
+        self.busyRetries = max(0, busyRetries)
+        self.maxBatch = max(1, maxBatch)
+        self.checkpointInterval = checkpointInterval
+        self.metrics = metrics
+        self.connection = sqlite3.connect(path, isolation_level=None, timeout=busyTimeout, check_same_thread=False)
+        journalMode = self.connection.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        if journalMode.lower()!='wal':
+            raise sqlite3.OperationalError(f'Could not switch {path} to WAL, journal_mode is {journalMode}')
+        if checkpointInterval>0:
+            self.connection.execute('PRAGMA wal_autocheckpoint=0')
+        for pragma in pragmas or ():
+            self.connection.execute(f'PRAGMA {pragma}')
+        self.queue = queue.Queue()
+        self.pending = deque()
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self._write_loop_, name=f'{TOOL_NAME}-writer', daemon=True)
+        self.thread.start()
+        self.checkpointer = None
+        if checkpointInterval>0:
+            self.checkpointer = threading.Thread(target=self._checkpoint_loop_, name=f'{TOOL_NAME}-checkpointer', daemon=True)
+            self.checkpointer.start()
+
+    def submit(self, query:str, params:Optional[Union[list, dict]]=None, many:Optional[list]=None, guard:Optional[SqlQueryGuard]=None) -> SqlWriteJob:
+        if self.closed.is_set():
+            raise sqlite3.ProgrammingError('Writer is closed')
+        job = SqlWriteJob(query, params, many, guard or SqlQueryGuard())
+        self.queue.put(job)
+        return job
+
+    def wait(self, job:SqlWriteJob) -> Tuple[List[str], List[tuple], int, Optional[int]]:
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+        remaining = job.guard.remaining()
+        while remaining is not None:
+            try:
+                return job.future.result(remaining)
+            except FutureTimeoutError:
+                if job.future.cancel():
+                    self._mark_started_(job)
+                    raise job.guard.error()
+                remaining = None
+        return job.future.result()
+
+    def close(self) -> None:
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        self.queue.put(None)
+        self.thread.join()
+        if self.checkpointer:
+            self.checkpointer.join()
+        try:
+            self.connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error:
+            pass
+        self.connection.close()
+
+    def _write_loop_(self) -> None:
+        stop = False
+        while not stop:
+            job = self._next_job_(True)
+            if job is None:
+                break
+            batch = [job]
+            while len(batch)<self.maxBatch:
+                try:
+                    job = self._next_job_(False)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            try:
+                self._write_batch_(batch)
+            except Exception as e:
+                if self.connection.in_transaction:
+                    self.connection.execute('ROLLBACK')
+                for job in batch:
+                    if not job.future.done():
+                        self._fail_(job, e)
+        while True:
+            try:
+                job = self._next_job_(False)
+            except queue.Empty:
+                break
+            if job is not None:
+                self._fail_(job, sqlite3.ProgrammingError('Writer is closed'))
+
+    def _next_job_(self, block:bool) -> Optional[SqlWriteJob]:
+        while True:
+            if self.pending:
+                return self.pending.popleft()
+            job = self.queue.get() if block else self.queue.get_nowait()
+            if job is None or job.future.set_running_or_notify_cancel():
+                return job
+
+    def _write_batch_(self, batch:List[SqlWriteJob]) -> None:
+        grouped = []
+        for index, job in enumerate(batch):
+            if SqlFileLoader.transactionKeywordRegex.match(job.query) or SqlFileLoader.outsideTransactionRegex.match(job.query):
+                self._commit_group_(grouped)
+                grouped = []
+                self._write_alone_(job)
+                continue
+            if not grouped and not self.connection.in_transaction:
+                self._begin_()
+            try:
+                grouped.append((job, self._execute_(job, True)))
+            except Exception as e:
+                self._fail_(job, e)
+                if not self.connection.in_transaction:
+                    self.pending.extendleft(reversed([done for done, _ in grouped]+batch[index+1:]))
+                    return
+        self._commit_group_(grouped)
+
+    def _write_alone_(self, job:SqlWriteJob) -> None:
+        if SqlFileLoader.transactionKeywordRegex.match(job.query):
+            self._finish_job_(job, ([], [], -1, None))
+            return
+        try:
+            result = self._execute_(job, False)
+        except Exception as e:
+            self._fail_(job, e)
+            return
+        finally:
+            if self.connection.in_transaction:
+                self.connection.execute('COMMIT')
+        self._finish_job_(job, result)
+
+    def _begin_(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                self.connection.execute('BEGIN IMMEDIATE')
+                return
+            except sqlite3.OperationalError as e:
+                if not Utils.isBusyError(e) or attempt>=self.busyRetries:
+                    raise
+            time.sleep(0.05*2**attempt)
+            attempt += 1
+            if self.metrics:
+                self.metrics.count('busyRetries')
+
+    def _commit_group_(self, grouped:List[Tuple[SqlWriteJob, tuple]]) -> None:
+        if not self.connection.in_transaction:
+            return
+        try:
+            self.connection.execute('COMMIT')
+        except sqlite3.Error as e:
+            if self.connection.in_transaction:
+                self.connection.execute('ROLLBACK')
+            for job, _ in grouped:
+                self._fail_(job, e)
+            return
+        if self.metrics and grouped:
+            self.metrics.count('groupCommits')
+            self.metrics.count('groupedWrites', len(grouped))
+        for job, result in grouped:
+            self._finish_job_(job, result)
+
+    def _finish_job_(self, job:SqlWriteJob, result:tuple) -> None:
+        self._mark_started_(job)
+        job.finished = time.perf_counter()
+        job.future.set_result(result)
+
+    def _fail_(self, job:SqlWriteJob, error:Exception) -> None:
+        self._mark_started_(job)
+        job.future.set_exception(error)
+
+    def _mark_started_(self, job:SqlWriteJob) -> None:
+        if job.started is None:
+            job.started = time.perf_counter()
+            if self.metrics:
+                self.metrics.gauge('waitingRequests', -1)
+
+    def _execute_(self, job:SqlWriteJob, grouped:bool) -> Tuple[List[str], List[tuple], int, Optional[int]]:
+        self._mark_started_(job)
+        job.guard.attach(self.connection, self.busyTimeout)
+        try:
+            if grouped:
+                self.connection.execute(f'SAVEPOINT {self.savepoint}')
+            cursor = self.connection.cursor()
+            try:
+                if job.many is not None:
+                    cursor.executemany(job.query, job.many)
+                elif job.params is not None:
+                    cursor.execute(job.query, job.params)
+                else:
+                    cursor.execute(job.query)
+                result = [column[0] for column in cursor.description or ()], cursor.fetchall(), cursor.rowcount, cursor.lastrowid
+            except sqlite3.Error:
+                if grouped and self.connection.in_transaction:
+                    self.connection.execute(f'ROLLBACK TO {self.savepoint}')
+                    self.connection.execute(f'RELEASE {self.savepoint}')
+                raise
+            finally:
+                cursor.close()
+            if grouped:
+                self.connection.execute(f'RELEASE {self.savepoint}')
+            return result
+        finally:
+            job.guard.detach()
+
+    def _checkpoint_loop_(self) -> None:
+        connection = sqlite3.connect(self.path, timeout=self.busyTimeout, check_same_thread=False)
+        try:
+            while not self.closed.wait(self.checkpointInterval):
+                try:
+                    busy, frames, checkpointed = connection.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+                except sqlite3.Error:
+                    continue
+                if self.metrics:
+                    self.metrics.count('checkpoints')
+                    self.metrics.count('checkpointedFrames', max(0, checkpointed))
+        finally:
+            connection.close()
+
+
+class WireProtocolError(ValueError):
+    pass
+
+
+class WireProtocol:
+    version = 1
+    header = struct.Struct('!BBI')
+    maxFrameSize = 64*1024*1024
+
+    QUERY = 0x01
+    EXECUTE = 0x02
+    COLUMNS = 0x10
+    ROWS = 0x11
+    DONE = 0x12
+    ERROR = 0x1F
+
+    NULL = 0
+    INTEGER = 1
+    REAL = 2
+    TEXT = 3
+    BLOB = 4
+    MIXED = 5
+    typeNames = ('null', 'integer', 'real', 'text', 'blob', 'mixed')
+    valueTypes = {type(None): NULL, bool: INTEGER, int: INTEGER, float: REAL, str: TEXT, bytes: BLOB}
+    binaryFormats = ('binary', 'columnar')
+    formats = Utils.outputFormats+binaryFormats
+    count = struct.Struct('!I')
+    integer = struct.Struct('!q')
+    real = struct.Struct('!d')
+    binaryLayouts = ('B', 'Bq', 'Bd')
+    zeroCopySize = 64*1024
+
+    @staticmethod
+    def isFramed(firstByte:int) -> bool:
+        return firstByte==WireProtocol.version
+
+    @staticmethod
+    def encodeFrame(frameType:int, payload:Union[bytes, str]) -> bytes:
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        return WireProtocol.header.pack(WireProtocol.version, frameType, len(payload))+payload
+
+    @staticmethod
+    def encodeJsonFrame(frameType:int, payload:Any) -> bytes:
+        return WireProtocol.encodeFrame(frameType, json.dumps(payload))
+
+    @staticmethod
+    def decodeHeader(header:bytes) -> Tuple[int, int]:
+        version, frameType, length = WireProtocol.header.unpack(header)
+        if version!=WireProtocol.version:
+            raise WireProtocolError(f'Unsupported protocol version {version}')
+        if length>WireProtocol.maxFrameSize:
+            raise WireProtocolError(f'Frame of {length} bytes exceeds the limit of {WireProtocol.maxFrameSize} bytes')
+        return frameType, length
+
+    @staticmethod
+    def encodeFrameParts(frameType:int, parts:List[Union[bytes, memoryview]]) -> Union[bytes, List[Union[bytes, memoryview]]]:
+        header = WireProtocol.header.pack(WireProtocol.version, frameType, sum(len(part) for part in parts))
+        if all(isinstance(part, bytes) for part in parts):
+            return header+b''.join(parts)
+        return [header, *parts]
+
+    @staticmethod
+    def encodeResult(rows:List[tuple], outputFormat:str) -> Union[bytes, List[Union[bytes, memoryview]]]:
+        if outputFormat=='binary':
+            return WireProtocol.encodeFrameParts(WireProtocol.ROWS, WireProtocol.encodeBinaryRows(rows))
+        if outputFormat=='columnar':
+            return WireProtocol.encodeFrameParts(WireProtocol.ROWS, WireProtocol.encodeColumnarRows(rows))
+        return WireProtocol.encodeFrame(WireProtocol.ROWS, Utils.encodeRows(rows, outputFormat))
+
+    @staticmethod
+    def columnTypes(rows:List[tuple], columns:int) -> List[str]:
+        types = []
+        for index in range(columns):
+            found = {WireProtocol.valueTypes.get(type(row[index]), WireProtocol.MIXED) for row in rows}-{WireProtocol.NULL}
+            types.append(WireProtocol.typeNames[found.pop() if len(found)==1 else WireProtocol.MIXED if found else WireProtocol.NULL])
+        return types
+
+    @staticmethod
+    def encodeBinaryRows(rows:List[tuple]) -> List[Union[bytes, memoryview]]:
+        parts, layout, values = [], ['!I'], [len(rows)]
+        for row in rows:
+            for value in row:
+                valueType = WireProtocol.valueTypes.get(type(value))
+                if valueType is None:
+                    raise WireProtocolError(f'Unsupported value type {type(value).__name__}')
+                if valueType==WireProtocol.TEXT or valueType==WireProtocol.BLOB:
+                    data = value.encode('utf-8') if valueType==WireProtocol.TEXT else value
+                    if len(data)>=WireProtocol.zeroCopySize:
+                        layout.append('BI')
+                        values += (valueType, len(data))
+                        parts += (struct.pack(''.join(layout), *values), memoryview(data))
+                        layout, values = ['!'], []
+                    else:
+                        layout.append(f'BI{len(data)}s')
+                        values += (valueType, len(data), data)
+                else:
+                    layout.append(WireProtocol.binaryLayouts[valueType])
+                    values.append(valueType)
+                    if valueType!=WireProtocol.NULL:
+                        values.append(value)
+        parts.append(struct.pack(''.join(layout), *values))
+        return parts
+
+    @staticmethod
+    def encodeColumnarRows(rows:List[tuple]) -> List[Union[bytes, memoryview]]:
+        parts, buffer = [], bytearray(WireProtocol.count.pack(len(rows)))
+        for column in zip(*rows):
+            values = [value for value in column if value is not None]
+            found = {WireProtocol.valueTypes.get(type(value), WireProtocol.MIXED) for value in values}
+            columnType = found.pop() if len(found)==1 else WireProtocol.MIXED if found else WireProtocol.NULL
+            buffer.append(columnType)
+            if len(values)<len(column):
+                buffer.append(1)
+                buffer += bytes(value is None for value in column)
+            else:
+                buffer.append(0)
+            if columnType==WireProtocol.INTEGER:
+                buffer += struct.pack(f'!{len(values)}q', *values)
+            elif columnType==WireProtocol.REAL:
+                buffer += struct.pack(f'!{len(values)}d', *values)
+            elif columnType in (WireProtocol.TEXT, WireProtocol.BLOB):
+                if columnType==WireProtocol.TEXT:
+                    values = [value.encode('utf-8') for value in values]
+                buffer += struct.pack(f'!{len(values)}I', *map(len, values))
+                for value in values:
+                    WireProtocol._append_bytes_(value, buffer, parts)
+            elif columnType==WireProtocol.MIXED:
+                for value in values:
+                    WireProtocol._encode_value_(value, buffer, parts)
+        parts.append(bytes(buffer))
+        return parts
+
+    @staticmethod
+    def decodeBinaryRows(payload:Union[bytes, bytearray], columns:int) -> List[tuple]:
+        view = memoryview(payload)
+        rows, offset = WireProtocol.count.unpack_from(view, 0)[0], WireProtocol.count.size
+        values = []
+        for _ in range(rows*columns):
+            value, offset = WireProtocol._decode_value_(view, offset)
+            values.append(value)
+        return [tuple(values[index:index+columns]) for index in range(0, len(values), columns)] if columns else [()]*rows
+
+    @staticmethod
+    def decodeColumnarRows(payload:Union[bytes, bytearray], columns:int) -> List[tuple]:
+        view = memoryview(payload)
+        rows, offset = WireProtocol.count.unpack_from(view, 0)[0], WireProtocol.count.size
+        data = []
+        for _ in range(columns):
+            columnType, hasNulls = view[offset], view[offset+1]
+            offset += 2
+            nulls = None
+            if hasNulls:
+                nulls = view[offset:offset+rows]
+                offset += rows
+            count = rows-sum(nulls) if nulls is not None else rows
+            if columnType==WireProtocol.INTEGER:
+                values = struct.unpack_from(f'!{count}q', view, offset)
+                offset += 8*count
+            elif columnType==WireProtocol.REAL:
+                values = struct.unpack_from(f'!{count}d', view, offset)
+                offset += 8*count
+            elif columnType in (WireProtocol.TEXT, WireProtocol.BLOB):
+                lengths = struct.unpack_from(f'!{count}I', view, offset)
+                offset += 4*count
+                values = []
+                for length in lengths:
+                    value = view[offset:offset+length]
+                    values.append(str(value, 'utf-8') if columnType==WireProtocol.TEXT else bytes(value))
+                    offset += length
+            elif columnType==WireProtocol.MIXED:
+                values = []
+                for _ in range(count):
+                    value, offset = WireProtocol._decode_value_(view, offset)
+                    values.append(value)
+            else:
+                values = ()
+            if nulls is not None:
+                iterator = iter(values)
+                values = [None if null else next(iterator) for null in nulls]
+            data.append(values)
+        return list(zip(*data)) if columns else [()]*rows
+
+    @staticmethod
+    def _encode_value_(value:Any, buffer:bytearray, parts:List[Union[bytes, memoryview]]) -> None:
+        valueType = WireProtocol.valueTypes.get(type(value))
+        if valueType is None:
+            raise WireProtocolError(f'Unsupported value type {type(value).__name__}')
+        buffer.append(valueType)
+        if valueType==WireProtocol.INTEGER:
+            buffer += WireProtocol.integer.pack(value)
+        elif valueType==WireProtocol.REAL:
+            buffer += WireProtocol.real.pack(value)
+        elif valueType!=WireProtocol.NULL:
+            value = value.encode('utf-8') if valueType==WireProtocol.TEXT else value
+            buffer += WireProtocol.count.pack(len(value))
+            WireProtocol._append_bytes_(value, buffer, parts)
+
+    @staticmethod
+    def _append_bytes_(value:bytes, buffer:bytearray, parts:List[Union[bytes, memoryview]]) -> None:
+        if len(value)<WireProtocol.zeroCopySize:
+            buffer += value
+            return
+        if buffer:
+            parts.append(bytes(buffer))
+            buffer.clear()
+        parts.append(memoryview(value))
+
+    @staticmethod
+    def _decode_value_(view:memoryview, offset:int) -> Tuple[Any, int]:
+        valueType = view[offset]
+        offset += 1
+        if valueType==WireProtocol.NULL:
+            return None, offset
+        if valueType==WireProtocol.INTEGER:
+            return WireProtocol.integer.unpack_from(view, offset)[0], offset+8
+        if valueType==WireProtocol.REAL:
+            return WireProtocol.real.unpack_from(view, offset)[0], offset+8
+        length = WireProtocol.count.unpack_from(view, offset)[0]
+        offset += 4
+        value = view[offset:offset+length]
+        return (str(value, 'utf-8') if valueType==WireProtocol.TEXT else bytes(value)), offset+length
+
+    @staticmethod
+    def decodeExecute(payload:bytes) -> Tuple[str, Optional[Union[list, dict]], Optional[list], Optional[str], Optional[float]]:
+        try:
+            request = json.loads(payload)
+        except ValueError as e:
+            raise WireProtocolError(f'Malformed execute frame: {e}')
+        if not isinstance(request, dict) or not isinstance(request.get('sql'), str):
+            raise WireProtocolError('Execute frame needs a "sql" string')
+        params, many = request.get('params'), request.get('many')
+        if params is not None and not isinstance(params, (list, dict)):
+            raise WireProtocolError('"params" must be a list or an object')
+        if many is not None and (params is not None or not isinstance(many, list) or not all(isinstance(row, (list, dict)) for row in many)):
+            raise WireProtocolError('"many" must be a list of lists or objects and excludes "params"')
+        outputFormat = request.get('format')
+        if outputFormat is not None and outputFormat not in WireProtocol.formats:
+            raise WireProtocolError(f'Unsupported format {outputFormat!r}, supported formats are {", ".join(WireProtocol.formats)}')
+        timeout = request.get('timeout')
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout<0):
+            raise WireProtocolError('"timeout" must be a number of seconds')
+        return request['sql'], params, many, outputFormat, timeout
+
+    @staticmethod
+    def decodeRows(payload:bytes, rowFormat:str, columns:int=0) -> List[Any]:
+        if rowFormat=='binary':
+            return WireProtocol.decodeBinaryRows(payload, columns)
+        if rowFormat=='columnar':
+            return WireProtocol.decodeColumnarRows(payload, columns)
+        text = payload.decode('utf-8')
+        if rowFormat=='ndjson':
+            return [json.loads(line) for line in text.splitlines()]
+        if rowFormat=='json':
+            return json.loads(text)
+        import ast
+        return ast.literal_eval(text)
+
+
+class RequestTiming:
+    phases = ('receive', 'translate', 'wait', 'execute', 'fetch', 'encode', 'send')
+    __slots__ = phases+('started', 'fingerprint', 'rows', 'bytes', 'error')
+
+    def __init__(self) -> None:
+        for phase in self.phases:
+            setattr(self, phase, 0.0)
+        self.started = time.perf_counter()
+        self.fingerprint = None
+        self.rows = 0
+        self.bytes = 0
+        self.error = False
+
+
+class ServerMetrics:
+    fingerprintRegex = re.compile(r"[xX]'[0-9a-fA-F]*'|'[^']*(?:''[^']*)*'|(?<![\w$])[-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\s+")
+    listRegex = re.compile(r'\?(?:\s*,\s*\?)+')
+    buckets = tuple(0.0001*2**index for index in range(20))
+    maxFingerprints = 1000
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.activeConnections = 0
+        self.peakConnections = 0
+        self.totalConnections = 0
+        self.queuedConnections = 0
+        self.pendingRequests = 0
+        self.activeRequests = 0
+        self.waitingRequests = 0
+        self._reset_()
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def fingerprint(query:str) -> str:
+        query = ServerMetrics.fingerprintRegex.sub(lambda match: ' ' if match.group(0).isspace() else '?', query).strip().rstrip(';').rstrip()
+        return ServerMetrics.listRegex.sub('?, ...', query)
+
+    def admit(self, name:str, limit:int) -> bool:
+        with self.lock:
+            if limit and getattr(self, name)>=limit:
+                self.rejected += 1
+                return False
+            setattr(self, name, getattr(self, name)+1)
+            return True
+
+    def count(self, name:str, delta:int=1) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name)+delta)
+
+    def gauge(self, name:str, delta:int) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name)+delta)
+            if name=='activeConnections' and delta>0:
+                self.totalConnections += delta
+                self.peakConnections = max(self.peakConnections, self.activeConnections)
+
+    def record(self, timing:RequestTiming) -> None:
+        total = time.perf_counter()-timing.started
+        with self.lock:
+            self.requests += 1
+            self.errors += timing.error
+            self.rows += timing.rows
+            self.bytesSent += timing.bytes
+            for phase in RequestTiming.phases:
+                self.phaseTotals[phase] += getattr(timing, phase)
+            if timing.fingerprint is None:
+                return
+            fingerprint = timing.fingerprint if timing.fingerprint in self.queries or len(self.queries)<self.maxFingerprints else '<other>'
+            entry = self.queries.get(fingerprint)
+            if entry is None:
+                entry = self.queries[fingerprint] = {'calls': 0, 'errors': 0, 'rows': 0, 'bytes': 0, 'total': 0.0, 'max': 0.0,
+                                                     'phases': dict.fromkeys(RequestTiming.phases, 0.0), 'histogram': [0]*(len(self.buckets)+1)}
+            entry['calls'] += 1
+            entry['errors'] += timing.error
+            entry['rows'] += timing.rows
+            entry['bytes'] += timing.bytes
+            entry['total'] += total
+            entry['max'] = max(entry['max'], total)
+            entry['histogram'][bisect_left(self.buckets, total)] += 1
+            for phase in RequestTiming.phases:
+                entry['phases'][phase] += getattr(timing, phase)
+
+    def command(self, query:str, batchSize:int) -> SqlQueryStream:
+        words = query.split()
+        if words[1:2]==['reset']:
+            with self.lock:
+                self._reset_()
+            return SqlQueryStream.fromRows(['name', 'value'], [('reset', True)], batchSize)
+        if words[1:2]==['queries']:
+            return SqlQueryStream.fromRows(['fingerprint', 'calls', 'errors', 'rows', 'bytes', 'total_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']+[f'{phase}_ms' for phase in RequestTiming.phases],
+                                           self.queryStats(int(words[2]) if len(words)>2 else 20), batchSize)
+        return SqlQueryStream.fromRows(['name', 'value'], list(self.serverStats().items()), batchSize)
+
+    def serverStats(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = {'uptime_s': round(time.monotonic()-self.started, 3), 'active_connections': self.activeConnections, 'peak_connections': self.peakConnections,
+                     'total_connections': self.totalConnections, 'queued_connections': self.queuedConnections, 'active_requests': self.activeRequests,
+                     'waiting_requests': self.waitingRequests, 'requests': self.requests, 'errors': self.errors, 'timeouts': self.timeouts, 'cancelled': self.cancelled,
+                     'rejected': self.rejected, 'busy_retries': self.busyRetries, 'group_commits': self.groupCommits, 'grouped_writes': self.groupedWrites,
+                     'checkpoints': self.checkpoints, 'checkpointed_frames': self.checkpointedFrames, 'rows': self.rows, 'bytes_sent': self.bytesSent}
+            stats.update({f'{phase}_ms': round(self.phaseTotals[phase]*1000, 3) for phase in RequestTiming.phases})
+            return stats
+
+    def queryStats(self, limit:int=20) -> List[tuple]:
+        with self.lock:
+            entries = sorted(self.queries.items(), key=lambda item: item[1]['total'], reverse=True)[:max(0, limit)]
+            return [(fingerprint, entry['calls'], entry['errors'], entry['rows'], entry['bytes'], round(entry['total']*1000, 3),
+                     *(round(self._percentile_(entry, quantile)*1000, 3) for quantile in (0.5, 0.95, 0.99)), round(entry['max']*1000, 3),
+                     *(round(entry['phases'][phase]*1000/entry['calls'], 3) for phase in RequestTiming.phases)) for fingerprint, entry in entries]
+
+    def _percentile_(self, entry:Dict[str, Any], quantile:float) -> float:
+        rank = quantile*entry['calls']
+        seen = 0
+        for index, count in enumerate(entry['histogram']):
+            seen += count
+            if count and seen>=rank:
+                return min(self.buckets[index], entry['max']) if index<len(self.buckets) else entry['max']
+        return entry['max']
+
+    def _reset_(self) -> None:
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.busyRetries = 0
+        self.groupCommits = 0
+        self.groupedWrites = 0
+        self.checkpoints = 0
+        self.checkpointedFrames = 0
+        self.rows = 0
+        self.bytesSent = 0
+        self.phaseTotals = dict.fromkeys(RequestTiming.phases, 0.0)
+        self.queries = {}
+
+
 class ClientHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.parked = False
+
     def handle(self):
+        core = self.server.core
+        client = f'{self.client_address[0]}:{self.client_address[1]}'
+        if core.keepAlive:
+            self.request.settimeout(core.keepAlive)
         try:
-            database = sqlite3.connect(self.server.core.dbPath)
+            first = self.request.recv(1, socket.MSG_PEEK)
+            if first and WireProtocol.isFramed(first[0]):
+                self._handle_framed_(core, client)
+            elif first:
+                self._handle_legacy_(core, client)
+        except OSError:
+            self.parked = False
+        finally:
+            if not self.parked:
+                self.request.close()
 
-            data = self.request.recv(self.server.core.bufferSize).strip().decode('utf-8')
-            self.server.core.sqlServerLogger.logInfo(message=data, header=f'{self.client_address[0]}:{self.client_address[1]}')
+    def _handle_legacy_(self, core:'ServerMode', client:str) -> None:
+        while True:
+            data = self.request.recv(core.bufferSize)
+            if not data:
+                break
+            timing = RequestTiming()
+            chunks = Utils.coalesceChunks(core.processRequest(data, client, timing), core.sendBufferSize)
+            try:
+                self._send_(chunks, timing)
+            finally:
+                chunks.close()
+                core.metrics.record(timing)
+            if not core.keepAlive:
+                break
+            if not self._pending_():
+                self.parked = True
+                break
 
-            result = Utils.queryExecute(database=database, query=data, toJson=self.server.core.toJson, alternativeSql=DataSetting.alternativeSql)
-            self.request.send(str(result).encode('utf-8'))
-        except (sqlite3.Error, Exception) as e:
-            self.server.core.sqlServerLogger.logError(message=repr(e), header=f'{self.client_address[0]}:{self.client_address[1]}')
-            self.request.sendall(b'Exception')
+    def _handle_framed_(self, core:'ServerMode', client:str) -> None:
+        while True:
+            header = self._recv_exactly_(WireProtocol.header.size)
+            if header is None:
+                break
+            timing = RequestTiming()
+            try:
+                frameType, length = WireProtocol.decodeHeader(header)
+            except WireProtocolError as e:
+                core.sqlServerLogger.logError(message=repr(e), header=client)
+                self.request.sendall(WireProtocol.encodeFrame(WireProtocol.ERROR, repr(e)))
+                break
+            payload = self._recv_exactly_(length) if length else b''
+            if payload is None:
+                break
+            timing.receive = time.perf_counter()-timing.started
+            frames = Utils.coalesceChunks(core.processFrame(frameType, payload, client, timing), core.sendBufferSize)
+            try:
+                self._send_(frames, timing)
+            finally:
+                frames.close()
+                core.metrics.record(timing)
+            if not self._pending_():
+                self.parked = True
+                break
+
+    def _send_(self, chunks:Iterator[bytes], timing:RequestTiming) -> None:
+        for chunk in chunks:
+            start = time.perf_counter()
+            if isinstance(chunk, list):
+                Utils.sendBuffers(self.request, chunk)
+                timing.bytes += sum(len(part) for part in chunk)
+            else:
+                self.request.sendall(chunk)
+                timing.bytes += len(chunk)
+            timing.send += time.perf_counter()-start
+
+    def _pending_(self) -> bool:
+        timeout = self.request.gettimeout()
+        self.request.setblocking(False)
+        try:
+            self.request.recv(1, socket.MSG_PEEK)
+            return True
+        except BlockingIOError:
+            return False
         finally:
-            database.commit()
-            database.close()
-            self.request.close()
+            self.request.settimeout(timeout)
+
+    def _recv_exactly_(self, size:int) -> Optional[bytes]:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received<size:
+            count = self.request.recv_into(view[received:])
+            if count==0:
+                if received==0:
+                    return None
+                raise ConnectionError('Connection closed in the middle of a frame')
+            received += count
+        return bytes(buffer)
+
+
+class ThreadPoolTCPServer(socketserver.TCPServer):
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, addr:Tuple[str, int], handler:type, workers:int, idleTimeout:float=0.0) -> None:
+        import selectors
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=TOOL_NAME)
+        self.idleTimeout = idleTimeout
+        self.activeRequests = set()
+        self.activeLock = threading.Lock()
+        self.parkedRequests = []
+        self.idleRequests = OrderedDict()
+        self.stopping = False
+        self.selector = selectors.DefaultSelector()
+        self.wakeReader, self.wakeWriter = socket.socketpair()
+        self.wakeReader.setblocking(False)
+        self.wakeWriter.setblocking(False)
+        self.selector.register(self.wakeReader, selectors.EVENT_READ)
+        self.watcher = threading.Thread(target=self._watch_parked_, name=f'{TOOL_NAME}-idle', daemon=True)
+        super().__init__(addr, handler)
+        self.watcher.start()
+
+    def process_request(self, request:socket.socket, client_address:Tuple[str, int]) -> None:
+        with self.activeLock:
+            self.activeRequests.add(request)
+        self.core.metrics.gauge('activeConnections', 1)
+        request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._park_(request, client_address)
+
+    def finish_request(self, request:socket.socket, client_address:Tuple[str, int]) -> bool:
+        return self.RequestHandlerClass(request, client_address, self).parked
+
+    def _process_request_worker_(self, request:socket.socket, client_address:Tuple[str, int]) -> None:
+        self.core.metrics.gauge('queuedConnections', -1)
+        parked = False
+        try:
+            parked = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.core.metrics.gauge('pendingRequests', -1)
+            if parked:
+                self._park_(request, client_address)
+            else:
+                self._close_request_(request)
+
+    def _park_(self, request:socket.socket, client_address:Tuple[str, int]) -> None:
+        with self.activeLock:
+            if not self.stopping:
+                self.parkedRequests.append((request, client_address))
+                request = None
+        if request is not None:
+            self._close_request_(request)
+            return
+        try:
+            self.wakeWriter.send(b'\0')
+        except BlockingIOError:
+            pass
+
+    def _watch_parked_(self) -> None:
+        import selectors
+        while True:
+            timeout = None
+            if self.idleRequests and self.idleTimeout:
+                timeout = max(0.0, next(iter(self.idleRequests.values()))-time.monotonic())
+            for key, _ in self.selector.select(timeout):
+                if key.fileobj is not self.wakeReader:
+                    self.selector.unregister(key.fileobj)
+                    del self.idleRequests[key.fileobj]
+                    self._submit_(key.fileobj, key.data)
+                    continue
+                try:
+                    self.wakeReader.recv(4096)
+                except BlockingIOError:
+                    pass
+                with self.activeLock:
+                    if self.stopping:
+                        return
+                    parked, self.parkedRequests = self.parkedRequests, []
+                for request, client_address in parked:
+                    self.selector.register(request, selectors.EVENT_READ, client_address)
+                    self.idleRequests[request] = time.monotonic()+self.idleTimeout
+            now = time.monotonic()
+            while self.idleRequests and self.idleTimeout and next(iter(self.idleRequests.values()))<=now:
+                request, _ = self.idleRequests.popitem(last=False)
+                self.selector.unregister(request)
+                self._close_request_(request)
+
+    def _submit_(self, request:socket.socket, client_address:Tuple[str, int]) -> None:
+        if self.core.admitWorker():
+            self.executor.submit(self._process_request_worker_, request, client_address)
+            return
+        try:
+            request.setblocking(False)
+            data = request.recv(self.core.bufferSize)
+            if data:
+                request.send(self.core.busyReply(WireProtocol.isFramed(data[0]), f'{client_address[0]}:{client_address[1]}'))
+        except OSError:
+            pass
+        self._close_request_(request)
+
+    def _close_request_(self, request:socket.socket) -> None:
+        with self.activeLock:
+            self.activeRequests.discard(request)
+        self.core.metrics.gauge('activeConnections', -1)
+        self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with self.activeLock:
+            stopping, self.stopping = self.stopping, True
+        if stopping:
+            return
+        try:
+            self.wakeWriter.send(b'\0')
+        except BlockingIOError:
+            pass
+        self.watcher.join()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.activeLock:
+            for request in self.activeRequests:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.selector.close()
+        self.wakeReader.close()
+        self.wakeWriter.close()
 
 
 class ServerMode:
-    def __init__(self, addr:Tuple[str, int], path:str, filelog:Union[str, None], bufferSize:int, toJson:bool, alternativeSqlFile:Union[Dict[str, str], None]) -> None:
-        self.console = Console()
+    sendBufferSize = 64*1024
+
+    def __init__(self, addr:Tuple[str, int], path:str, filelog:Union[str, None], bufferSize:int, outputFormat:str, alternativeSqlFile:Union[Dict[str, str], None], workers:int=16, backend:str='thread', poolSize:Optional[int]=None, pragmas:Optional[Iterable[str]]=None, poolIdleTimeout:float=300.0, keepAlive:float=0.0, batchSize:int=500, cache:Optional[QueryResultCache]=None, statementCacheSize:int=128, logOptions:Optional[Dict[str, Any]]=None, queryTimeout:float=0.0, busyTimeout:float=5.0, busyRetries:int=3, maxWaiting:int=0, wal:bool=False, groupCommitSize:int=64, checkpointInterval:float=10.0) -> None:
         self.dbPath = path
         self.addr = addr
-        self.sqlServerLogger = SqlServerLogger(self.console, True, filelog) if filelog else SqlServerLogger(self.console)
+        self.sqlServerLogger = SqlServerLogger(None, True, filelog, **(logOptions or {})) if filelog else SqlServerLogger(**(logOptions or {}))
         self.bufferSize = bufferSize
-        self.toJson = toJson
+        self.outputFormat = outputFormat
         self.alternativeSql = Utils.getDictFromJsonFile(alternativeSqlFile) if alternativeSqlFile else None
+        self.workers = workers
+        self.backend = backend
+        self.keepAlive = keepAlive
+        self.batchSize = batchSize
+        self.cache = cache
+        self.queryTimeout = queryTimeout
+        self.busyTimeout = busyTimeout
+        self.busyRetries = max(0, busyRetries)
+        self.maxWaiting = max(0, maxWaiting)
+        self.writeLock = threading.Lock()
+        self.metrics = ServerMetrics()
+        self.running = {}
+        self.lastRunningId = 0
+        self.runningLock = threading.Lock()
+        self.streamExecutor = None
+        self.writer = SqlGroupCommitWriter(path, pragmas, busyTimeout, busyRetries, groupCommitSize, checkpointInterval, self.metrics) if wal else None
+        self.pool = SqlConnectionPool(path, maxSize=poolSize or workers, pragmas=pragmas, idleTimeout=poolIdleTimeout, cachedStatements=statementCacheSize, busyTimeout=busyTimeout, readOnly=wal)
+
+    @contextmanager
+    def openStream(self, query:str, params:Optional[Union[list, dict]]=None, many:Optional[list]=None, timing:Optional[RequestTiming]=None, timeout:Optional[float]=None, client:str='') -> Iterator[SqlQueryStream]:
+        if params is None and many is None and query.split()[:1]==['_cache']:
+            yield Utils.cacheCommand(self.cache, query, self.batchSize)
+            return
+        if params is None and many is None and query.split()[:1]==['_stats']:
+            yield self.metrics.command(query, self.batchSize)
+            return
+        if params is None and many is None and query.split()[:1]==['_cancel']:
+            yield self.cancelCommand(query)
+            return
+        timing = timing or RequestTiming()
+        timing.fingerprint = ServerMetrics.fingerprint(query)
+        guard = SqlQueryGuard(min(filter(None, (timeout, self.queryTimeout)), default=None), client, timing.fingerprint)
+        if not self.metrics.admit('waitingRequests', self.maxWaiting):
+            raise self.busyError('the database')
+        start = time.perf_counter()
+        waiting = True
+        write = many is not None or not Utils.isReadOnlyQuery(query)
+        locked = False
+        stream = None
+        self._register_(guard)
+        try:
+            if not write or not self.writer:
+                if write:
+                    locked = self.writeLock.acquire(timeout=-1 if guard.deadline is None else guard.remaining())
+                    if not locked:
+                        raise guard.error()
+                try:
+                    database = self.pool.acquire(guard.remaining())
+                except TimeoutError:
+                    if guard.deadline is None:
+                        raise
+                    raise guard.error()
+                try:
+                    self.metrics.gauge('waitingRequests', -1)
+                    waiting = False
+                    timing.wait += time.perf_counter()-start
+                    start = time.perf_counter()
+                    guard.attach(database, self.busyTimeout)
+                    try:
+                        stream = self._execute_(database, query, params, many, guard)
+                        if write:
+                            stream = SqlQueryStream.fromRows(stream.columns, [row for rows in stream for row in rows], self.batchSize, stream.rowcount, stream.lastrowid)
+                    except sqlite3.OperationalError as e:
+                        if not self.writer or not Utils.isReadOnlyError(e):
+                            raise
+                    if stream is not None:
+                        timing.execute += time.perf_counter()-start
+                    if stream is not None and not write:
+                        yield stream
+                        timing.rows += stream.rows
+                except sqlite3.OperationalError as e:
+                    if not guard.fired():
+                        raise
+                    raise guard.error() from e
+                finally:
+                    guard.detach()
+                    self.pool.release(database)
+                    if locked:
+                        self.writeLock.release()
+                        locked = False
+                if write:
+                    yield stream
+                    timing.rows += stream.rows
+            if stream is None:
+                if not waiting:
+                    self.metrics.gauge('waitingRequests', 1)
+                waiting = False
+                try:
+                    stream = self._write_stream_(query, params, many, guard, timing)
+                except sqlite3.OperationalError as e:
+                    if not guard.fired():
+                        raise
+                    raise guard.error() from e
+                yield stream
+                timing.rows += stream.rows
+        except (QueryTimeoutError, QueryCancelledError) as e:
+            self.metrics.count('timeouts' if isinstance(e, QueryTimeoutError) else 'cancelled')
+            raise
+        finally:
+            self._unregister_(guard)
+            if locked:
+                self.writeLock.release()
+            if waiting:
+                self.metrics.gauge('waitingRequests', -1)
+
+    def _write_stream_(self, query:str, params:Optional[Union[list, dict]], many:Optional[list], guard:SqlQueryGuard, timing:RequestTiming) -> SqlQueryStream:
+        access = self.cache.analyze(query, many[0] if many else params) if self.cache else None
+        try:
+            job = self.writer.submit(query, params, many, guard)
+        except sqlite3.Error:
+            self.metrics.gauge('waitingRequests', -1)
+            raise
+        columns, rows, rowcount, lastrowid = self.writer.wait(job)
+        timing.wait += job.started-job.submitted
+        timing.execute += job.finished-job.started
+        if access and (access.schemaChanged or access.written):
+            self.cache.invalidate(None if access.schemaChanged else access.written)
+        return SqlQueryStream.fromRows(columns, rows, self.batchSize, rowcount, lastrowid)
+
+    def cancelCommand(self, query:str) -> SqlQueryStream:
+        words = query.split()
+        if len(words)>1:
+            with self.runningLock:
+                guard = self.running.get(int(words[1])) if words[1].isdigit() else None
+            return SqlQueryStream.fromRows(['id', 'cancelled'], [(words[1], guard.cancel() if guard else False)], self.batchSize)
+        now = time.monotonic()
+        with self.runningLock:
+            rows = [(guard.id, guard.client, round((now-guard.started)*1000, 3), guard.timeout, guard.query) for guard in self.running.values()]
+        return SqlQueryStream.fromRows(['id', 'client', 'elapsed_ms', 'timeout_s', 'fingerprint'], rows, self.batchSize)
+
+    def cancelRunning(self) -> None:
+        with self.runningLock:
+            guards = list(self.running.values())
+        for guard in guards:
+            guard.cancel()
+
+    def _execute_(self, database:sqlite3.Connection, query:str, params:Optional[Union[list, dict]], many:Optional[list], guard:SqlQueryGuard) -> SqlQueryStream:
+        attempt = 0
+        while True:
+            try:
+                return SqlQueryStream(database, query, batchSize=self.batchSize, cache=self.cache, params=params, many=many)
+            except sqlite3.OperationalError as e:
+                if not Utils.isBusyError(e) or attempt>=self.busyRetries or guard.fired():
+                    raise
+            delay = min(0.05*2**attempt, guard.remaining() if guard.deadline is not None else 1.0)
+            attempt += 1
+            self.metrics.count('busyRetries')
+            time.sleep(delay)
+
+    def _register_(self, guard:SqlQueryGuard) -> None:
+        with self.runningLock:
+            self.lastRunningId += 1
+            guard.id = self.lastRunningId
+            self.running[guard.id] = guard
+
+    def _unregister_(self, guard:SqlQueryGuard) -> None:
+        with self.runningLock:
+            self.running.pop(guard.id, None)
+
+    def admitWorker(self) -> bool:
+        if not self.metrics.admit('pendingRequests', self.maxWaiting and self.workers+self.maxWaiting):
+            return False
+        self.metrics.gauge('queuedConnections', 1)
+        return True
+
+    def busyError(self, resource:str) -> ServerBusyError:
+        return ServerBusyError(f'Server busy: {self.maxWaiting} requests are already waiting for {resource}')
+
+    def busyReply(self, framed:bool, client:str) -> bytes:
+        error = self.busyError('a worker')
+        self.sqlServerLogger.logError(message=repr(error), header=client)
+        return WireProtocol.encodeFrame(WireProtocol.ERROR, repr(error)) if framed else b'Exception'
+
+    def processRequest(self, data:bytes, client:str, timing:Optional[RequestTiming]=None) -> Iterator[bytes]:
+        timing = timing or RequestTiming()
+        self.metrics.gauge('activeRequests', 1)
+        sent = b''
+        try:
+            query = data.strip().decode('utf-8')
+            self.sqlServerLogger.logInfo(message=query, header=client)
+            start = time.perf_counter()
+            if DataSetting.alternativeSql:
+                query = Utils.convertQuery(query, DataSetting.alternativeSql)
+            timing.translate += time.perf_counter()-start
+            with self.openStream(query, timing=timing, client=client) as stream:
+                first = True
+                start = time.perf_counter()
+                for chunk in Utils.encodeStream(self._timed_batches_(stream, timing), self.outputFormat):
+                    data = chunk.encode('utf-8')
+                    timing.encode += time.perf_counter()-start
+                    yield data
+                    sent = data or sent
+                    if first and stream.rows:
+                        if stream.rows>=stream.batchSize:
+                            yield b''
+                        first = False
+                    start = time.perf_counter()
+        except (sqlite3.Error, Exception) as e:
+            timing.error = True
+            self.sqlServerLogger.logError(message=repr(e), header=client)
+            yield (b'' if not sent or sent.endswith(b'\n') else b'\n')+b'Exception'+(b'\n' if sent else b'')
+        finally:
+            timing.encode = max(0.0, timing.encode-timing.fetch)
+            self.metrics.gauge('activeRequests', -1)
+
+    def processFrame(self, frameType:int, payload:bytes, client:str, timing:Optional[RequestTiming]=None) -> Iterator[bytes]:
+        if frameType not in (WireProtocol.QUERY, WireProtocol.EXECUTE):
+            yield WireProtocol.encodeFrame(WireProtocol.ERROR, f'Unsupported frame type {frameType}')
+            return
+        timing = timing or RequestTiming()
+        self.metrics.gauge('activeRequests', 1)
+        try:
+            start = time.perf_counter()
+            if frameType==WireProtocol.EXECUTE:
+                query, params, many, outputFormat, timeout = WireProtocol.decodeExecute(payload)
+            else:
+                query, params, many, outputFormat, timeout = payload.decode('utf-8'), None, None, None, None
+            outputFormat = outputFormat or self.outputFormat
+            timing.receive += time.perf_counter()-start
+            self.sqlServerLogger.logInfo(message=query if many is None else f'{query} [{len(many)} parameter sets]', header=client)
+            start = time.perf_counter()
+            if DataSetting.alternativeSql:
+                query = Utils.convertQuery(query, DataSetting.alternativeSql)
+            timing.translate += time.perf_counter()-start
+            with self.openStream(query, params, many, timing, timeout, client) as stream:
+                batches = self._timed_batches_(stream, timing)
+                rows = next(batches, None)
+                yield WireProtocol.encodeJsonFrame(WireProtocol.COLUMNS, {'format': outputFormat, 'columns': stream.columns, 'types': WireProtocol.columnTypes(rows or [], len(stream.columns))})
+                first = True
+                while rows is not None:
+                    start = time.perf_counter()
+                    frame = WireProtocol.encodeResult(rows, outputFormat)
+                    timing.encode += time.perf_counter()-start
+                    yield frame
+                    if first and len(rows)>=stream.batchSize:
+                        yield b''
+                    first = False
+                    rows = next(batches, None)
+            yield WireProtocol.encodeJsonFrame(WireProtocol.DONE, {'rows': stream.rows, 'rowcount': stream.rowcount, 'lastrowid': stream.lastrowid})
+        except (sqlite3.Error, Exception) as e:
+            timing.error = True
+            self.sqlServerLogger.logError(message=repr(e), header=client)
+            yield WireProtocol.encodeFrame(WireProtocol.ERROR, repr(e))
+        finally:
+            self.metrics.gauge('activeRequests', -1)
+
+    def _timed_batches_(self, stream:SqlQueryStream, timing:RequestTiming) -> Iterator[List[tuple]]:
+        batches = iter(stream)
+        while True:
+            start = time.perf_counter()
+            rows = next(batches, None)
+            timing.fetch += time.perf_counter()-start
+            if rows is None:
+                return
+            yield rows
 
     def run(self) -> None:
-        with socketserver.TCPServer(self.addr, ClientHandler) as server:
+        try:
+            if self.backend=='asyncio':
+                import asyncio
+                asyncio.run(self._serve_asyncio_())
+            else:
+                self._serve_threads_()
+        except KeyboardInterrupt:
+            Utils.createConsole().print('Clossing...')
+        except Exception as e:
+            Utils.createConsole().print(repr(e))
+        finally:
+            self.cancelRunning()
+            if self.writer:
+                self.writer.close()
+            self.pool.close()
+            if self.cache:
+                self.cache.close()
+            self.sqlServerLogger.close()
+
+    def _serve_threads_(self) -> None:
+        with ThreadPoolTCPServer(self.addr, ClientHandler, self.workers, self.keepAlive) as server:
             server.core = self
             try:
                 server.serve_forever()
-            except KeyboardInterrupt:
-                self.console.print('Clossing...')
-            except Exception as e:
-                self.console.print(repr(e))
             finally:
                 server.server_close()
 
+    async def _serve_asyncio_(self) -> None:
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=TOOL_NAME))
+        self.streamExecutor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'{TOOL_NAME}-stream')
+        try:
+            server = await asyncio.start_server(self._handle_asyncio_client_, self.addr[0], self.addr[1], reuse_address=True, backlog=ThreadPoolTCPServer.request_queue_size)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.streamExecutor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_asyncio_client_(self, reader:'asyncio.StreamReader', writer:'asyncio.StreamWriter') -> None:
+        import asyncio
+        peer = writer.get_extra_info('peername')
+        client = f'{peer[0]}:{peer[1]}'
+        self.metrics.gauge('activeConnections', 1)
+        try:
+            first = await asyncio.wait_for(reader.read(1), self.keepAlive or None)
+            if first and WireProtocol.isFramed(first[0]):
+                await self._handle_asyncio_framed_(reader, writer, client, first)
+            elif first:
+                await self._handle_asyncio_legacy_(reader, writer, client, first)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.CancelledError, OSError):
+            pass
+        finally:
+            self.metrics.gauge('activeConnections', -1)
+            writer.close()
+
+    async def _handle_asyncio_legacy_(self, reader:'asyncio.StreamReader', writer:'asyncio.StreamWriter', client:str, data:bytes) -> None:
+        import asyncio
+        data += await reader.read(self.bufferSize-1) if self.bufferSize>1 else b''
+        while data:
+            timing = RequestTiming()
+            if not self.admitWorker():
+                writer.write(self.busyReply(False, client))
+                await writer.drain()
+            else:
+                try:
+                    await self._send_asyncio_(writer, Utils.coalesceChunks(self.processRequest(data, client, timing), self.sendBufferSize), timing)
+                finally:
+                    self.metrics.record(timing)
+            if not self.keepAlive:
+                break
+            data = await asyncio.wait_for(reader.read(self.bufferSize), self.keepAlive)
+
+    async def _handle_asyncio_framed_(self, reader:'asyncio.StreamReader', writer:'asyncio.StreamWriter', client:str, first:bytes) -> None:
+        import asyncio
+        header = first+await reader.readexactly(WireProtocol.header.size-1)
+        while True:
+            timing = RequestTiming()
+            try:
+                frameType, length = WireProtocol.decodeHeader(header)
+            except WireProtocolError as e:
+                self.sqlServerLogger.logError(message=repr(e), header=client)
+                writer.write(WireProtocol.encodeFrame(WireProtocol.ERROR, repr(e)))
+                await writer.drain()
+                return
+            payload = await reader.readexactly(length) if length else b''
+            timing.receive = time.perf_counter()-timing.started
+            if not self.admitWorker():
+                writer.write(self.busyReply(True, client))
+                await writer.drain()
+            else:
+                try:
+                    await self._send_asyncio_(writer, Utils.coalesceChunks(self.processFrame(frameType, payload, client, timing), self.sendBufferSize), timing)
+                finally:
+                    self.metrics.record(timing)
+            try:
+                header = await asyncio.wait_for(reader.readexactly(WireProtocol.header.size), self.keepAlive or None)
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    raise
+                return
+
+    def _next_queued_(self, chunks:Iterator[bytes]) -> Optional[bytes]:
+        self.metrics.gauge('queuedConnections', -1)
+        return next(chunks, None)
+
+    async def _send_asyncio_(self, writer:'asyncio.StreamWriter', chunks:Iterator[bytes], timing:RequestTiming) -> None:
+        import asyncio
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                chunk = await loop.run_in_executor(None, self._next_queued_, chunks)
+            finally:
+                self.metrics.gauge('pendingRequests', -1)
+            while chunk is not None:
+                start = time.perf_counter()
+                if isinstance(chunk, list):
+                    writer.writelines(chunk)
+                    timing.bytes += sum(len(part) for part in chunk)
+                else:
+                    writer.write(chunk)
+                    timing.bytes += len(chunk)
+                await writer.drain()
+                timing.send += time.perf_counter()-start
+                chunk = await loop.run_in_executor(self.streamExecutor, next, chunks, None)
+        finally:
+            chunks.close()
+
+
+class PulseQLClient:
+    def __init__(self, addr:Tuple[str, int], timeout:Optional[float]=None, outputFormat:Optional[str]=None, queryTimeout:Optional[float]=None) -> None:
+        if outputFormat is not None and outputFormat not in WireProtocol.formats:
+            raise ValueError(f'Unsupported format {outputFormat!r}, supported formats are {", ".join(WireProtocol.formats)}')
+        self.socket = socket.create_connection(addr, timeout=timeout)
+        self.outputFormat = outputFormat
+        self.queryTimeout = queryTimeout
+        self.columns = []
+        self.types = []
+        self.summary = {}
+
+    def query(self, query:str, params:Optional[Union[list, tuple, dict]]=None) -> Iterator[Any]:
+        if params is None and self.outputFormat is None and self.queryTimeout is None:
+            self.socket.sendall(WireProtocol.encodeFrame(WireProtocol.QUERY, query))
+        else:
+            request = {'sql': query, 'format': self.outputFormat, 'timeout': self.queryTimeout}
+            if params is not None:
+                request['params'] = params if isinstance(params, dict) else list(params)
+            self.socket.sendall(WireProtocol.encodeJsonFrame(WireProtocol.EXECUTE, request))
+        return self._read_results_()
+
+    def executemany(self, query:str, seqOfParams:Iterable[Union[list, tuple, dict]]) -> Dict[str, Any]:
+        many = [params if isinstance(params, dict) else list(params) for params in seqOfParams]
+        self.socket.sendall(WireProtocol.encodeJsonFrame(WireProtocol.EXECUTE, {'sql': query, 'many': many, 'format': self.outputFormat, 'timeout': self.queryTimeout}))
+        for _ in self._read_results_():
+            pass
+        return self.summary
+
+    def _read_results_(self) -> Iterator[Any]:
+        rowFormat = 'str'
+        while True:
+            frameType, payload = self._read_frame_()
+            if frameType==WireProtocol.COLUMNS:
+                header = json.loads(payload)
+                rowFormat, self.columns, self.types = header['format'], header['columns'], header.get('types', [])
+            elif frameType==WireProtocol.ROWS:
+                yield from WireProtocol.decodeRows(payload, rowFormat, len(self.columns))
+            elif frameType==WireProtocol.DONE:
+                self.summary = json.loads(payload)
+                return
+            elif frameType==WireProtocol.ERROR:
+                raise sqlite3.DatabaseError(payload.decode('utf-8'))
+            else:
+                raise WireProtocolError(f'Unexpected frame type {frameType}')
+
+    def fetchall(self, query:str, params:Optional[Union[list, tuple, dict]]=None) -> List[Any]:
+        return list(self.query(query, params))
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def __enter__(self) -> 'PulseQLClient':
+        return self
+
+    def __exit__(self, *args:Any) -> None:
+        self.close()
+
+    def _read_frame_(self) -> Tuple[int, bytearray]:
+        frameType, length = WireProtocol.decodeHeader(self._read_exactly_(WireProtocol.header.size))
+        return frameType, self._read_exactly_(length)
+
+    def _read_exactly_(self, size:int) -> bytearray:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received<size:
+            count = self.socket.recv_into(view[received:])
+            if count==0:
+                raise ConnectionError('Connection closed by server')
+            received += count
+        return buffer
+
 
 
 if __name__=='__main__':
     if args.file:
-        SqlFileLoader(path=args.database, files=args.file)
+        SqlFileLoader(path=args.database, files=args.file, transactionSize=args.file_transaction_size, wal=args.file_wal, unsafe=args.file_unsafe, jobs=args.file_jobs, progressInterval=args.file_progress)
+
+    cache = QueryResultCache(args.database, maxEntries=args.query_cache, maxBytes=int(args.query_cache_memory*1024*1024), ttl=args.query_cache_ttl, maxRows=args.query_cache_rows) if args.query_cache else None
 
     if args.console:
-        ConsoleMode(path=args.database, toJson=args.json, autoComplete=args.console_auto_complete, alternativeSqlFile=args.dictionary_json).run()
+        ConsoleMode(path=args.database, outputFormat=args.output_format, autoComplete=args.console_auto_complete, alternativeSqlFile=args.dictionary_json, batchSize=args.fetch_batch_size, cache=cache, pageSize=args.console_page_size).run()
     elif args.server:
-        ServerMode(addr=(args.server[0], args.server[1]), path=args.database, filelog=args.server_file_log, bufferSize=args.server_buffer_size, toJson=args.json, alternativeSqlFile=args.dictionary_json).run()
+        ServerMode(addr=(args.server[0], args.server[1]), path=args.database, filelog=args.server_file_log, bufferSize=args.server_buffer_size, outputFormat=args.output_format, alternativeSqlFile=args.dictionary_json, workers=args.server_workers, backend=args.server_backend, poolSize=args.server_pool_size, pragmas=args.server_pragma, poolIdleTimeout=args.server_pool_idle, keepAlive=args.server_keep_alive, batchSize=args.fetch_batch_size, cache=cache, statementCacheSize=args.server_statement_cache,
+                   logOptions={'logFormat': args.server_log_format, 'maxBytes': int(args.server_log_rotate*1024*1024), 'backupCount': args.server_log_backups, 'sampleRate': args.server_log_sample, 'rateLimit': args.server_log_limit},
+                   queryTimeout=args.server_query_timeout, busyTimeout=args.server_busy_timeout, busyRetries=args.server_busy_retries, maxWaiting=args.server_queue,
+                   wal=args.server_wal, groupCommitSize=args.server_group_commit, checkpointInterval=args.server_wal_checkpoint).run()
     else:
         parser.print_help()
     exit()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOL = os.path.join(ROOT, 'PulseQL.py')
+sys.path.insert(0, ROOT)
+
+
+def percentiles(values:List[float], scale:float=1000.0) -> Dict[str, float]:
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0, 'mean': 0.0}
+    values = sorted(values)
+    pick = lambda quantile: values[min(len(values)-1, int(quantile*len(values)))]
+    return {'p50': round(pick(0.5)*scale, 3), 'p95': round(pick(0.95)*scale, 3), 'p99': round(pick(0.99)*scale, 3),
+            'max': round(values[-1]*scale, 3), 'mean': round(sum(values)/len(values)*scale, 3)}
+
+
+def freePort() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def startTool(args:List[str], port:Optional[int]=None, timeout:float=15.0) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, TOOL]+args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic()+timeout
+    while port and time.monotonic()<deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{TOOL} exited with code {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    if port:
+        process.kill()
+        raise RuntimeError(f'Server did not listen on port {port}')
+    return process
+
+
+def waitTool(process:subprocess.Popen, block:bool=True) -> Optional[Tuple[int, Optional[int]]]:
+    if not hasattr(os, 'wait4'):
+        returncode = process.wait() if block else process.poll()
+        return None if returncode is None else (returncode, None)
+    pid, status, usage = os.wait4(process.pid, 0 if block else os.WNOHANG)
+    if pid==0:
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, usage.ru_maxrss//1024 if sys.platform=='darwin' else usage.ru_maxrss
+
+
+def stopTool(process:subprocess.Popen, timeout:float=10.0) -> Optional[int]:
+    process.terminate()
+    deadline = time.monotonic()+timeout
+    while time.monotonic()<deadline:
+        result = waitTool(process, block=False)
+        if result is not None:
+            return result[1]
+        time.sleep(0.05)
+    process.kill()
+    return waitTool(process)[1]
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {'commit': commit, 'python': sys.version.split()[0], 'platform': sys.platform, 'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
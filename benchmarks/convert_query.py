@@ -0,0 +1,64 @@
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+
+import common
+from PulseQL import SqlTranslator
+
+
+ALTERNATIVE_SQL = {'PRENDI': 'SELECT', 'DA': 'FROM', 'DOVE': 'WHERE', 'E': 'AND', 'O': 'OR', 'INSERISCI': 'INSERT', 'IN_TABELLA': 'INTO', 'VALORI': 'VALUES'}
+
+
+def naiveConvertQuery(query:str, alternativeSql:dict) -> str:
+    words = query.split(' ')
+    query = ''
+    for i in range(len(words)):
+        if words[i] in alternativeSql.keys():
+            words[i] = alternativeSql[words[i]]
+        query += words[i]+' '
+    return query[:-1]
+
+
+def buildQuery(rows:int) -> str:
+    values = ', '.join(f"({i}, 'name DA {i}', {i/3:.3f})" for i in range(rows))
+    return f'INSERISCI IN_TABELLA users(id, name, score) VALORI {values}'
+
+
+def measure(function, query:str, repeat:int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(query)
+    return (time.perf_counter()-start)/repeat
+
+
+def runConvertQuery(rowCounts:List[int], repeat:int=5) -> List[Dict[str, Any]]:
+    translator = SqlTranslator(ALTERNATIVE_SQL)
+    results = []
+    for rows in rowCounts:
+        query = buildQuery(rows)
+        size = len(query)/1024
+        if translator._translate_(query)!=naiveConvertQuery(query, ALTERNATIVE_SQL).replace("'name FROM", "'name DA"):
+            raise SystemExit('Translations differ')
+        naive = measure(lambda q: naiveConvertQuery(q, ALTERNATIVE_SQL), query, repeat)
+        compiled = measure(translator._translate_, query, repeat)
+        translator.translate(query)
+        repeated = measure(translator.translate, query, repeat)
+        results.append({'rows': rows, 'kib': round(size, 1), 'naive_us_per_kib': round(naive/size*1e6, 2), 'compiled_us_per_kib': round(compiled/size*1e6, 2), 'repeated_us': round(repeated*1e6, 2)})
+    return results
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Compare the -d dictionary translation with a plain word split')
+    parser.add_argument('-r', '--rows', metavar='rows', type=int, nargs='+', default=[1, 10, 100, 1000, 10000, 50000])
+    parser.add_argument('-n', '--repeat', metavar='times', type=int, default=5)
+    parser.add_argument('-j', '--json', action='store_true', help='Print JSON instead of a table')
+    args = parser.parse_args()
+
+    results = runConvertQuery(args.rows, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f'{"rows":>8} {"KiB":>8} {"naive us/KiB":>14} {"compiled us/KiB":>16} {"repeated us":>12}')
+        for result in results:
+            print(f'{result["rows"]:>8} {result["kib"]:>8.1f} {result["naive_us_per_kib"]:>14.2f} {result["compiled_us_per_kib"]:>16.2f} {result["repeated_us"]:>12.2f}')
@@ -0,0 +1,67 @@
+import os
+import random
+import sqlite3
+import argparse
+
+STATUSES = ('new', 'paid', 'shipped', 'delivered', 'refunded')
+SCHEMA = ('CREATE TABLE users(id INTEGER PRIMARY KEY, name TEXT NOT NULL, email TEXT NOT NULL, age INTEGER, created TEXT)',
+          'CREATE TABLE orders(id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), amount REAL NOT NULL, status TEXT NOT NULL, note TEXT, created TEXT)',
+          'CREATE INDEX orders_user ON orders(user_id)')
+
+
+def userRows(users:int, seed:int=1):
+    generator = random.Random(seed)
+    for index in range(1, users+1):
+        yield (index, f'user {index}', f'user{index}@example.com', generator.randint(18, 90), f'2024-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d}')
+
+
+def orderRows(orders:int, users:int, seed:int=2):
+    generator = random.Random(seed)
+    for index in range(1, orders+1):
+        yield (index, generator.randint(1, users), round(generator.uniform(1, 500), 2), generator.choice(STATUSES),
+               "it's order "+str(index) if index%7==0 else None, f'2025-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d}')
+
+
+def createDataset(path:str, users:int, orders:int) -> str:
+    if os.path.exists(path):
+        os.remove(path)
+    database = sqlite3.connect(path)
+    with database:
+        for statement in SCHEMA:
+            database.execute(statement)
+        database.executemany('INSERT INTO users VALUES (?, ?, ?, ?, ?)', userRows(users))
+        database.executemany('INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)', orderRows(orders, users))
+    database.close()
+    return path
+
+
+def sqlLiteral(value) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return "'"+value.replace("'", "''")+"'"
+    return repr(value)
+
+
+def writeSqlFile(path:str, users:int, orders:int) -> int:
+    with open(path, 'w', encoding='utf-8') as file:
+        for statement in SCHEMA:
+            file.write(statement+';\n')
+        for row in userRows(users):
+            file.write(f'INSERT INTO users VALUES ({", ".join(map(sqlLiteral, row))});\n')
+        for row in orderRows(orders, users):
+            file.write(f'INSERT INTO orders VALUES ({", ".join(map(sqlLiteral, row))});\n')
+    return users+orders
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Create a synthetic users/orders dataset')
+    parser.add_argument('path', help='Output .db file, or .sql file of INSERT statements')
+    parser.add_argument('-u', '--users', metavar='rows', type=int, default=10000)
+    parser.add_argument('-o', '--orders', metavar='rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.path.endswith('.sql'):
+        writeSqlFile(args.path, args.users, args.orders)
+    else:
+        createDataset(args.path, args.users, args.orders)
@@ -0,0 +1,63 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+from common import startTool, waitTool
+from dataset import writeSqlFile
+
+CHECK_STATEMENTS = ('CREATE TABLE loader_check(position INTEGER, changed INTEGER, total REAL)',
+                    *['INSERT INTO loader_check VALUES ((SELECT count(*) FROM loader_check), changes(), (SELECT sum(amount) FROM orders))']*3,
+                    "INSERT INTO loader_check VALUES (-1, 0x10, 'it''s')", 'INSERT INTO loader_check VALUES (abs(-2), - 3, +.5)')
+
+
+def matchesStatements(script:str, database:str) -> bool:
+    reference = sqlite3.connect(':memory:')
+    with open(script, 'r', encoding='utf-8') as file:
+        reference.executescript(file.read())
+    loaded = sqlite3.connect(database)
+    try:
+        tables = [row[0] for row in reference.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+        if tables!=[row[0] for row in loaded.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]:
+            return False
+        for table in tables:
+            query = f'SELECT * FROM "{table}" ORDER BY rowid'
+            expected, actual = reference.execute(query), loaded.execute(query)
+            while True:
+                rows = expected.fetchmany(10000)
+                if rows!=actual.fetchmany(10000):
+                    return False
+                if not rows:
+                    break
+        return True
+    finally:
+        loaded.close()
+        reference.close()
+
+
+def runFileLoader(directory:str, users:int, orders:int, loaderArgs:List[str]=()) -> Dict[str, Any]:
+    script = os.path.join(directory, 'load.sql')
+    database = os.path.join(directory, 'load.db')
+    rows = writeSqlFile(script, users, orders)
+    with open(script, 'a', encoding='utf-8') as file:
+        file.writelines(statement+';\n' for statement in CHECK_STATEMENTS)
+    if os.path.exists(database):
+        os.remove(database)
+    begin = time.perf_counter()
+    returncode, peakRss = waitTool(startTool(['-db', database, '-f', script, '-fp', '0', *loaderArgs]))
+    elapsed = time.perf_counter()-begin
+    return {'rows': rows, 'bytes': os.path.getsize(script), 'returncode': returncode, 'seconds': round(elapsed, 3),
+            'rows_per_s': round(rows/elapsed, 1) if elapsed else 0.0, 'peak_rss_kib': peakRss, 'matches_statements': matchesStatements(script, database)}
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Time SqlFileLoader on a generated file of INSERT statements')
+    parser.add_argument('-u', '--users', metavar='rows', type=int, default=10000)
+    parser.add_argument('-o', '--orders', metavar='rows', type=int, default=200000)
+    args, loaderArgs = parser.parse_known_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(json.dumps(runFileLoader(directory, args.users, args.orders, loaderArgs), indent=2))
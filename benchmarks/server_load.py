@@ -0,0 +1,77 @@
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from common import percentiles, freePort, startTool, stopTool
+from dataset import createDataset, STATUSES
+from PulseQL import PulseQLClient, WireProtocol
+
+READS = (('SELECT * FROM users WHERE id=?', lambda generator, users: [generator.randint(1, users)]),
+         ('SELECT id, amount, status FROM orders WHERE user_id=?', lambda generator, users: [generator.randint(1, users)]),
+         ('SELECT status, count(*), sum(amount) FROM orders WHERE user_id BETWEEN ? AND ? GROUP BY status', lambda generator, users: (lambda low: [low, low+50])(generator.randint(1, users))))
+WRITES = (('INSERT INTO orders(user_id, amount, status, created) VALUES (?, ?, ?, ?)', lambda generator, users: [generator.randint(1, users), round(generator.uniform(1, 500), 2), generator.choice(STATUSES), '2026-01-01']),
+          ('UPDATE users SET age=age+1 WHERE id=?', lambda generator, users: [generator.randint(1, users)]))
+
+
+def runClient(port:int, seed:int, requests:int, writeRatio:float, users:int, start:threading.Barrier, latencies:Dict[str, List[float]], errors:List[int], outputFormat:Optional[str]=None) -> None:
+    generator = random.Random(seed)
+    reads, writes, failed = [], [], 0
+    with PulseQLClient(('127.0.0.1', port), outputFormat=outputFormat) as client:
+        start.wait()
+        for _ in range(requests):
+            write = generator.random()<writeRatio
+            query, params = generator.choice(WRITES if write else READS)
+            begin = time.perf_counter()
+            try:
+                client.fetchall(query, params(generator, users))
+            except Exception:
+                failed += 1
+            (writes if write else reads).append(time.perf_counter()-begin)
+    latencies['read'].extend(reads)
+    latencies['write'].extend(writes)
+    errors.append(failed)
+
+
+def runServerLoad(database:str, users:int, clients:int=8, requests:int=1000, writeRatio:float=0.1, backend:str='thread', workers:int=16, serverArgs:List[str]=(), outputFormat:Optional[str]=None) -> Dict[str, Any]:
+    port = freePort()
+    server = startTool(['-s', f'127.0.0.1:{port}', '-db', database, '-sk', '60', '-se', backend, '-sw', str(workers), '-sls', '0', *serverArgs], port)
+    try:
+        latencies, errors = {'read': [], 'write': []}, []
+        start = threading.Barrier(clients+1)
+        threads = [threading.Thread(target=runClient, args=(port, seed, requests, writeRatio, users, start, latencies, errors, outputFormat)) for seed in range(clients)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        begin = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter()-begin
+    finally:
+        peakRss = stopTool(server)
+    total = len(latencies['read'])+len(latencies['write'])
+    return {'backend': backend, 'format': outputFormat or 'server default', 'clients': clients, 'requests': total, 'errors': sum(errors), 'write_ratio': writeRatio, 'seconds': round(elapsed, 3),
+            'throughput_rps': round(total/elapsed, 1) if elapsed else 0.0, 'latency_ms': percentiles(latencies['read']+latencies['write']),
+            'read_latency_ms': percentiles(latencies['read']), 'write_latency_ms': percentiles(latencies['write']), 'server_peak_rss_kib': peakRss}
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Drive ServerMode with concurrent framed clients')
+    parser.add_argument('-u', '--users', metavar='rows', type=int, default=10000)
+    parser.add_argument('-o', '--orders', metavar='rows', type=int, default=100000)
+    parser.add_argument('-c', '--clients', metavar='clients', type=int, default=8)
+    parser.add_argument('-n', '--requests', metavar='requests', type=int, default=1000, help='Requests sent by each client')
+    parser.add_argument('-w', '--write-ratio', metavar='ratio', type=float, default=0.1)
+    parser.add_argument('-se', '--server-backend', choices=('thread', 'asyncio'), default='thread')
+    parser.add_argument('-sw', '--server-workers', metavar='workers', type=int, default=16)
+    parser.add_argument('-f', '--format', choices=WireProtocol.formats, help='Result format requested by the clients (Default is the server one)')
+    args, serverArgs = parser.parse_known_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = createDataset(os.path.join(directory, 'bench.db'), args.users, args.orders)
+        result = runServerLoad(database, args.users, args.clients, args.requests, args.write_ratio, args.server_backend, args.server_workers, serverArgs, args.format)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+from common import ROOT, TOOL, freePort
+
+LAUNCHERS = {'script': [sys.executable, TOOL], 'module': [sys.executable, '-m', 'PulseQL']}
+LAZY_MODULES = ('asyncio', 'rich', 'prompt_toolkit', 'pygments', 'csv', 'signal', 'urllib.parse', 'concurrent.futures', 'logging')
+
+
+def timeCommand(command:List[str]) -> float:
+    begin = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter()-begin
+
+
+def timeServerReady(command:List[str], database:str, timeout:float=10.0) -> float:
+    port = freePort()
+    begin = time.perf_counter()
+    process = subprocess.Popen(command+['-s', f'127.0.0.1:{port}', '-db', database], cwd=ROOT, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter()-begin<timeout:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return time.perf_counter()-begin
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f'Server exited with code {process.returncode}')
+                time.sleep(0.001)
+        raise RuntimeError(f'Server did not listen on port {port}')
+    finally:
+        process.kill()
+        process.wait()
+
+
+def summarize(values:List[float]) -> Dict[str, float]:
+    return {'min_ms': round(min(values)*1000, 1), 'median_ms': round(statistics.median(values)*1000, 1)}
+
+
+def runStartup(runs:int=10) -> Dict[str, Any]:
+    results = {'python_ms': summarize([timeCommand([sys.executable, '-c', 'pass']) for _ in range(runs)])}
+    timeCommand([sys.executable, '-c', 'import PulseQL'])
+    results['import_ms'] = summarize([timeCommand([sys.executable, '-c', 'import PulseQL']) for _ in range(runs)])
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'startup.db')
+        for name, command in LAUNCHERS.items():
+            results[f'{name}_version_ms'] = summarize([timeCommand(command+['--version']) for _ in range(runs)])
+            results[f'{name}_server_ready_ms'] = summarize([timeServerReady(command, database) for _ in range(runs)])
+    loaded = subprocess.run([sys.executable, '-c', f'import sys, PulseQL; print(" ".join(name for name in {LAZY_MODULES!r} if name in sys.modules))'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+    results['eagerly_imported'] = loaded
+    return results
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Time PulseQL startup: module import, --version and ServerMode ready to accept connections')
+    parser.add_argument('-n', '--runs', metavar='runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps(runStartup(args.runs), indent=2))
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+from typing import Any, Dict
+
+from common import environment
+from dataset import createDataset
+from convert_query import runConvertQuery
+from file_loader import runFileLoader
+from server_load import runServerLoad
+from startup import runStartup
+
+SCALES = {
+    'small': {'users': 2000, 'orders': 20000, 'clients': 4, 'requests': 500, 'loader_orders': 50000},
+    'medium': {'users': 10000, 'orders': 100000, 'clients': 8, 'requests': 2000, 'loader_orders': 200000},
+    'large': {'users': 50000, 'orders': 1000000, 'clients': 32, 'requests': 5000, 'loader_orders': 1000000},
+}
+
+
+def runSuite(scale:str, writeRatio:float) -> Dict[str, Any]:
+    config = dict(SCALES[scale], scale=scale, write_ratio=writeRatio)
+    results = {'startup': runStartup(), 'convert_query': runConvertQuery([10, 1000, 10000])}
+    with tempfile.TemporaryDirectory() as directory:
+        results['file_loader'] = runFileLoader(directory, config['users'], config['loader_orders'])
+        for backend in ('thread', 'asyncio'):
+            for name, ratio in (('read', 0.0), ('mixed', writeRatio)):
+                database = createDataset(os.path.join(directory, 'bench.db'), config['users'], config['orders'])
+                results[f'server_{backend}_{name}'] = runServerLoad(database, config['users'], config['clients'], config['requests'], ratio, backend)
+        database = createDataset(os.path.join(directory, 'bench.db'), config['users'], config['orders'])
+        results['server_thread_wal_mixed'] = runServerLoad(database, config['users'], config['clients'], config['requests'], writeRatio, 'thread', serverArgs=['-swal'])
+    return {'environment': environment(), 'config': config, 'results': results}
+
+
+def flatten(value:Any, prefix:str='') -> Dict[str, float]:
+    if isinstance(value, dict):
+        return {key: number for name, item in value.items() for key, number in flatten(item, f'{prefix}.{name}' if prefix else name).items()}
+    if isinstance(value, list):
+        return {key: number for index, item in enumerate(value) for key, number in flatten(item, f'{prefix}[{index}]').items()}
+    return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+
+
+def compare(baseline:Dict[str, Any], current:Dict[str, Any]) -> None:
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    print(f'{"metric":<48} {baseline["environment"]["commit"] or "baseline":>12} {current["environment"]["commit"] or "current":>12} {"change":>9}')
+    for key in sorted(old.keys() & new.keys()):
+        change = f'{(new[key]-old[key])/old[key]*100:+.1f}%' if old[key] else ''
+        print(f'{key:<48} {old[key]:>12} {new[key]:>12} {change:>9}')
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Run every PulseQL benchmark and write the results as JSON')
+    parser.add_argument('-s', '--scale', choices=tuple(SCALES), default='small')
+    parser.add_argument('-w', '--write-ratio', metavar='ratio', type=float, default=0.2, help='Share of writes in the mixed server workload')
+    parser.add_argument('-o', '--output', metavar='file.json', help='Write results to this file instead of stdout')
+    parser.add_argument('-c', '--compare', metavar='baseline.json', help='Print the change of every metric against a previous run')
+    args = parser.parse_args()
+
+    report = runSuite(args.scale, args.write_ratio)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(json.load(file), report)